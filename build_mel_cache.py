@@ -0,0 +1,116 @@
+#!/usr/bin/env python3
+"""
+One-time pass that stores the CNN input features of every dataset mp3 as .npy.
+
+The verification scripts check this cache before decoding an mp3, so repeat
+runs skip the decode + STFT entirely. Entries are float16 (features are
+normalized to [0, 1]) and are ignored once the source mp3 is newer.
+"""
+import os
+import numpy as np
+import librosa
+from concurrent.futures import ThreadPoolExecutor
+
+# Dataset path (same as the verification scripts)
+DATASET_PATH = '/Users/sezarhanna/Downloads/maqamidataset'
+
+# Kept beside the dataset rather than inside it, so it never shows up as a maqam folder
+MEL_CACHE_DIR = DATASET_PATH.rstrip(os.sep) + '_mel_cache'
+
+# 60-band mel filterbank for 22050 Hz / n_fft=2048, built once
+MEL_BASIS = librosa.filters.mel(sr=22050, n_fft=2048, n_mels=60).astype(np.float32)
+
+
+def mel_to_db(mel_spec, amin=1e-10, top_db=80.0):
+    """librosa.power_to_db(mel_spec, ref=np.max), computed in place on mel_spec."""
+    np.maximum(mel_spec, amin, out=mel_spec)
+    np.log10(mel_spec, out=mel_spec)
+    mel_spec *= 10.0
+    # log10 is monotonic, so the log of ref=max is the max of the logs
+    mel_spec -= mel_spec.max()
+    # Same top_db floor as librosa: the max is now 0 dB
+    np.maximum(mel_spec, -top_db, out=mel_spec)
+    return mel_spec
+
+
+def cache_path(audio_path):
+    """MEL_CACHE_DIR/{maqam}/{file}.npy for DATASET_PATH/{maqam}/{file}.mp3"""
+    maqam = os.path.basename(os.path.dirname(audio_path))
+    stem = os.path.splitext(os.path.basename(audio_path))[0]
+    return os.path.join(MEL_CACHE_DIR, maqam, stem + '.npy')
+
+
+def is_cached(audio_path):
+    """True if audio_path has a cache entry at least as new as the file itself."""
+    try:
+        return os.path.getmtime(cache_path(audio_path)) >= os.path.getmtime(audio_path)
+    except OSError:
+        return False
+
+
+def load_cached_features(audio_path):
+    """Cached float32 features for audio_path, or None if missing or stale."""
+    if not is_cached(audio_path):
+        return None
+    try:
+        return np.load(cache_path(audio_path), mmap_mode='r').astype(np.float32)
+    except (OSError, ValueError):
+        return None
+
+
+def compute_features(audio_path, target_shape=(60, 358), min_seconds=2.0):
+    """CNN input features for one file, shared by the cache and the verification scripts.
+
+    Returns None for clips shorter than min_seconds; shorter time axes are zero-padded.
+    """
+    y, sr = librosa.load(audio_path, sr=22050, duration=8.0)
+    if len(y) < sr * min_seconds:
+        return None
+    y = y.astype(np.float32, copy=False)
+    power = np.abs(librosa.stft(y, n_fft=2048, hop_length=512)) ** 2
+    mel_spec_db = mel_to_db(MEL_BASIS @ power)
+
+    features = np.zeros(target_shape, dtype=np.float32)
+    n_frames = min(mel_spec_db.shape[1], target_shape[1])
+    features[:, :n_frames] = mel_spec_db[:, :n_frames]
+
+    np.subtract(features, features.min(), out=features)
+    np.divide(features, features.max() + np.float32(1e-8), out=features)
+    return features
+
+
+def cache_file(audio_path):
+    """Compute and store one file's features; returns True if an entry was written."""
+    try:
+        features = compute_features(audio_path)
+    except Exception as e:
+        print(f"Error processing {audio_path}: {e}")
+        return False
+    if features is None:
+        return False  # Too short: the scripts decide for themselves
+
+    npy_path = cache_path(audio_path)
+    os.makedirs(os.path.dirname(npy_path), exist_ok=True)
+    np.save(npy_path, features.astype(np.float16))
+    return True
+
+
+def main():
+    audio_paths = []
+    for maqam in sorted(os.listdir(DATASET_PATH)):
+        maqam_path = os.path.join(DATASET_PATH, maqam)
+        if not os.path.isdir(maqam_path) or maqam.startswith('.'):
+            continue
+        for audio_file in os.listdir(maqam_path):
+            audio_path = os.path.join(maqam_path, audio_file)
+            if audio_file.endswith('.mp3') and not is_cached(audio_path):
+                audio_paths.append(audio_path)
+
+    print(f"Caching features for {len(audio_paths)} files into {MEL_CACHE_DIR}...")
+    with ThreadPoolExecutor(max_workers=os.cpu_count()) as executor:
+        written = sum(executor.map(cache_file, audio_paths))
+    print(f"Done: {written} entries written.")
+
+
+if __name__ == '__main__':
+    main()
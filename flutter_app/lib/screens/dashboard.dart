@@ -1,4 +1,5 @@
 import 'dart:async';
+import 'dart:convert';
 import 'dart:math';
 import 'dart:typed_data';
 import 'package:flutter/material.dart';
@@ -35,33 +36,68 @@ class _DashboardScreenState extends State<DashboardScreen> {
           // Flatten chromagram if it comes as [36][Time]
           // For simplicity, we just take the mean of the first frame or last frame
           // API sends [36, Time] list.
-          List<dynamic> rawChroma = data["chromagram"];
-          // We expect a list of 36 floats (if 1 frame) or list of lists
-          // Let's assume the API sums it up or we simplify. 
-          // If API sends 2D array, let's take the average energy per bin.
-          
-          if (rawChroma.isNotEmpty && rawChroma[0] is List) {
-             // 2D case
-             _chromagram = List.generate(36, (i) {
-               double sum = 0;
-               for(var frame in rawChroma) {
-                 sum += (frame[i] as num).toDouble();
-               }
-               return sum / rawChroma.length; // This logic depends on exact shape
-             });
+          if (data["chromagram"] is String) {
+            // base64 float16 matrix [bins, frames] (little-endian), averaged per bin
+            _chromagram = _decodeChromagram(data["chromagram"], data["chroma_shape"]);
           } else {
-             // 1D case (flattened or single frame)
-             _chromagram = rawChroma.map((e) => (e as num).toDouble()).toList();
+            List<dynamic> rawChroma = data["chromagram"];
+            // We expect a list of 36 floats (if 1 frame) or list of lists
+            // Let's assume the API sums it up or we simplify. 
+            // If API sends 2D array, let's take the average energy per bin.
+            
+            if (rawChroma.isNotEmpty && rawChroma[0] is List) {
+               // 2D case
+               _chromagram = List.generate(36, (i) {
+                 double sum = 0;
+                 for(var frame in rawChroma) {
+                   sum += (frame[i] as num).toDouble();
+                 }
+                 return sum / rawChroma.length; // This logic depends on exact shape
+               });
+            } else {
+               // 1D case (flattened or single frame)
+               _chromagram = rawChroma.map((e) => (e as num).toDouble()).toList();
+            }
           }
 
           _currentMaqam = data["prediction"] ?? "Unknown";
-          _scores = data["confidence"] ?? {};
+          // The API sends a single confidence value; per-class maps are shown as-is
+          final confidence = data["confidence"];
+          if (confidence is Map<String, dynamic>) {
+            _scores = confidence;
+          } else if (confidence is num) {
+            _scores = {_currentMaqam: confidence.toDouble()};
+          } else {
+            _scores = {};
+          }
           _rukooz = data["rukooz"] ?? -1;
         });
       }
     });
   }
 
+  List<double> _decodeChromagram(String encoded, List<dynamic> shape) {
+    final bytes = ByteData.sublistView(base64Decode(encoded));
+    final int bins = shape[0];
+    final int frames = shape[1];
+    return List.generate(bins, (i) {
+      double sum = 0;
+      for (int t = 0; t < frames; t++) {
+        sum += _halfToDouble(bytes.getUint16((i * frames + t) * 2, Endian.little));
+      }
+      return frames > 0 ? sum / frames : 0.0;
+    });
+  }
+
+  double _halfToDouble(int h) {
+    final sign = (h & 0x8000) != 0 ? -1.0 : 1.0;
+    final exponent = (h >> 10) & 0x1f;
+    final fraction = h & 0x3ff;
+    if (exponent == 0) return sign * fraction * pow(2, -24).toDouble();
+    if (exponent == 0x1f) return fraction == 0 ? sign * double.infinity : double.nan;
+    return sign * (1 + fraction / 1024) * pow(2, exponent - 15).toDouble();
+  }
+
   Future<void> _uploadFile() async {
     FilePickerResult? result = await FilePicker.platform.pickFiles(
       type: FileType.custom,
@@ -15,8 +15,18 @@ In 36-bin resolution (6 bins per semitone = quarter-tone accuracy):
 - 1.5 steps (augmented second) = 9 bins
 """
 
+import functools
+import sys
+import types
+from dataclasses import dataclass
+
 import numpy as np
 
+try:
+    from .numba_compat import njit, nb_types, NUMBA_AVAILABLE
+except ImportError:
+    from numba_compat import njit, nb_types, NUMBA_AVAILABLE
+
 # ============================================================================
 # JINS DEFINITIONS (36-bin intervals from root = 0)
 # Source: https://www.maqamworld.com/en/jins.php
@@ -516,20 +526,300 @@ MAQAM_STRUCTURE = {
 }
 
 
+def _intern_names(jins_library, maqam_structure):
+    """
+    Intern every jins/maqam name in place (keys and jins references).
+    
+    Names returned by match_jins and those stored in MAQAM_STRUCTURE then
+    share one object, so dict lookups and == compares hit the identity path.
+    """
+    for table in (jins_library, maqam_structure):
+        for name in list(table):
+            # pop + reinsert in the original order keeps the dict order intact
+            table[sys.intern(name)] = table.pop(name)
+    for structure in maqam_structure.values():
+        for key in ("jins1", "jins2", "alt_jins2"):
+            if key in structure:
+                structure[key] = sys.intern(structure[key])
+
+
+def _freeze_table(table):
+    """Read-only view of a jins/maqam table with every list value stored as a tuple."""
+    return types.MappingProxyType({
+        name: {key: tuple(value) if isinstance(value, list) else value for key, value in entry.items()}
+        for name, entry in table.items()
+    })
+
+
+_intern_names(JINS_LIBRARY, MAQAM_STRUCTURE)
+
+# The tables feed the import-time lookup structures and caches below,
+# so they must not change underneath them
+JINS_LIBRARY = _freeze_table(JINS_LIBRARY)
+MAQAM_STRUCTURE = _freeze_table(MAQAM_STRUCTURE)
+
+
+# ============================================================================
+# SCORING KERNEL (jins interval bitmasks + popcount match counting)
+# ============================================================================
+
+def _build_interval_table(jins_library):
+    """
+    Pack the jins interval patterns into a padded (n_jins, max_size) int8 table.
+    
+    Returns:
+        Tuple of (names, intervals, sizes); unused slots hold -128.
+    """
+    names = [name for name, data in jins_library.items() if data.get("intervals_bins")]
+    sizes = np.array([len(jins_library[name]["intervals_bins"]) for name in names], dtype=np.int8)
+    intervals = np.full((len(names), int(sizes.max())), -128, dtype=np.int8)
+    for row, name in enumerate(names):
+        intervals[row, :sizes[row]] = jins_library[name]["intervals_bins"]
+    return names, intervals, sizes
+
+
+def _build_interval_masks(intervals, sizes):
+    """One uint64 fingerprint per jins: bit b is set when b is one of its intervals."""
+    masks = np.zeros(len(sizes), dtype=np.uint64)
+    for row, size in enumerate(sizes):
+        for interval in intervals[row, :size]:
+            masks[row] |= np.uint64(1) << np.uint64(interval)
+    return masks
+
+
+_JINS_NAMES, _JINS_INTERVALS, _JINS_SIZES = _build_interval_table(JINS_LIBRARY)
+_JINS_MASKS = _build_interval_masks(_JINS_INTERVALS, _JINS_SIZES)
+for _table in (_JINS_INTERVALS, _JINS_SIZES, _JINS_MASKS):
+    _table.setflags(write=False)
+
+_M1 = np.uint64(0x5555555555555555)
+_M2 = np.uint64(0x3333333333333333)
+_M4 = np.uint64(0x0F0F0F0F0F0F0F0F)
+_H01 = np.uint64(0x0101010101010101)
+
+
+@functools.lru_cache(maxsize=None)
+def _window_masks(tolerance):
+    """
+    Per-tolerance lookup table: entry note + 128 is the uint64 mask of every
+    bin within tolerance of that (int8) note, clipped to bits 0-63.
+    
+    Tolerance takes only a handful of values, so this is built once per value.
+    """
+    notes = np.arange(-128, 128, dtype=np.int64)
+    offsets = np.arange(-tolerance, tolerance + 1)
+    bits = notes[:, None] + offsets[None, :]
+    # Negative bins wrap to huge unsigned values, so one compare does 0 <= b < 64
+    bits = bits.astype(np.uint64)
+    in_range = bits < np.uint64(64)
+    windows = np.where(in_range, np.uint64(1) << np.where(in_range, bits, np.uint64(0)), np.uint64(0))
+    lut = np.bitwise_or.reduce(windows, axis=1, initial=np.uint64(0))
+    lut.setflags(write=False)
+    return lut
+
+
+def _notes_mask(unique_notes, tolerance):
+    """
+    Bitmask of every bin within tolerance of a note.
+    
+    ANDing it with a jins fingerprint leaves exactly the intervals that have
+    a note within tolerance, so the popcount equals the old match count.
+    """
+    windows = _window_masks(tolerance)[np.asarray(unique_notes, dtype=np.int64) + 128]
+    return np.bitwise_or.reduce(windows, initial=np.uint64(0))
+
+
+def _popcount64(x):
+    """Branchless SWAR popcount over a uint64 array."""
+    x = x - ((x >> np.uint64(1)) & _M1)
+    x = (x & _M2) + ((x >> np.uint64(2)) & _M2)
+    x = (x + (x >> np.uint64(4))) & _M4
+    return (x * _H01) >> np.uint64(56)
+
+
+# Explicit signature: numba compiles the kernel eagerly at import (or loads it
+# from the on-disk cache) instead of on the first request that scores a jins
+_SCORE_JINS_SIGNATURE = nb_types.int64[::1](
+    nb_types.uint64,
+    nb_types.Array(nb_types.uint64, 1, "C", readonly=True),
+    nb_types.Array(nb_types.int8, 1, "C", readonly=True),
+) if NUMBA_AVAILABLE else None
+
+
+@njit(_SCORE_JINS_SIGNATURE, cache=True, nogil=True)
+def _score_jins(notes_mask, jins_masks, sizes):
+    """
+    Count, for every jins fingerprint, how many of its intervals are covered by notes_mask.
+    
+    Stops at the first perfect match: every earlier jins scored below 1.0,
+    so argmax over the (zero-filled) rest still picks the same jins.
+    """
+    matches = np.zeros(jins_masks.shape[0], dtype=np.int64)
+    for j in range(jins_masks.shape[0]):
+        x = jins_masks[j] & notes_mask
+        x = x - ((x >> np.uint64(1)) & _M1)
+        x = (x & _M2) + ((x >> np.uint64(2)) & _M2)
+        x = (x + (x >> np.uint64(4))) & _M4
+        matches[j] = (x * _H01) >> np.uint64(56)
+        if matches[j] == sizes[j]:
+            break
+    return matches
+
+
+def _score_jins_vectorized(notes_mask, jins_masks, sizes):
+    """NumPy equivalent of _score_jins: one AND + popcount across all fingerprints."""
+    return _popcount64(jins_masks & notes_mask).astype(np.int64)
+
+
+# Without numba the loop kernel would run as plain Python, so use the NumPy pass
+_count_matches = _score_jins if NUMBA_AVAILABLE else _score_jins_vectorized
+
+
+# ============================================================================
+# RESULT RECORDS (slots objects inside the hot path, dicts at the API boundary)
+# ============================================================================
+
+@dataclass(slots=True, frozen=True)
+class JinsMatch:
+    """Best-matching jins for a note set; frozen so cached instances can be shared."""
+    name: str
+    confidence: float
+    
+    def to_dict(self):
+        return {"jins": self.name, "confidence": self.confidence}
+
+
+@dataclass(slots=True)
+class MaqamPrediction:
+    """Maqam predicted from a (jins1, jins2) pair."""
+    maqam: str
+    jins1: str
+    jins2: str
+    confidence: float
+    family: str
+    variant: bool = False
+    jins2_root: int = None
+    
+    def to_dict(self):
+        result = {
+            "maqam": self.maqam,
+            "jins1": self.jins1,
+            "jins2": self.jins2,
+            "confidence": self.confidence,
+            "family": self.family
+        }
+        if self.variant:
+            result["variant"] = True
+        if self.jins2_root is not None:
+            result["jins2_root"] = self.jins2_root
+        return result
+
+
+_UNKNOWN_MATCH = JinsMatch("Unknown", 0.0)
+
+# Fallback maqam names for unmatched jins pairs, formatted once
+_FALLBACK_NAMES = {name: f"{name}-based" for name in (*JINS_LIBRARY, "Unknown")}
+
+
+def _match_jins(unique_notes, jins_masks, sizes, tolerance):
+    """
+    Score a note set against every jins fingerprint.
+    
+    All state is passed in explicitly, so this has no self or global lookups.
+    
+    Returns:
+        Tuple of (row index of the best jins or -1 if nothing matched, score)
+    """
+    notes_mask = _notes_mask(unique_notes, tolerance)
+    scores = _count_matches(notes_mask, jins_masks, sizes) / sizes
+    
+    # argmax keeps the first jins on ties, like the original strict '>' scan
+    best_idx = int(np.argmax(scores))
+    best_score = float(scores[best_idx])
+    if best_score <= 0:
+        return -1, 0
+    return best_idx, best_score
+
+
+@functools.lru_cache(maxsize=4096)
+def _match_jins_cached(unique_notes, tolerance):
+    """
+    Best jins for a note set, memoized across calls and analyzer instances.
+    
+    Args:
+        unique_notes: Sorted tuple of the distinct bins in the sequence
+        tolerance: How many bins of deviation allowed for matching
+    """
+    best_idx, best_score = _match_jins(unique_notes, _JINS_MASKS, _JINS_SIZES, tolerance)
+    if best_idx < 0:
+        return JinsMatch("Unknown", best_score)
+    return JinsMatch(_JINS_NAMES[best_idx], best_score)
+
+
+def _match_note_set(unique_notes, n_notes, tolerance=2):
+    """
+    Shared match_jins body for callers that already hold the unique notes.
+    
+    Args:
+        unique_notes: Sorted tuple of the distinct bins in the sequence
+        n_notes: Length of the sequence they came from (fewer than 3 is Unknown)
+        tolerance: How many bins of deviation allowed for matching
+        
+    Returns:
+        JinsMatch
+    """
+    if n_notes < 3:
+        return _UNKNOWN_MATCH
+    return _match_jins_cached(unique_notes, tolerance)
+
+
+@functools.lru_cache(maxsize=1024)
+def _sweep_roots_cached(analyzer_cls, unique_notes, notes_below, notes_above):
+    """
+    JinsAnalyzer._sweep_roots memoized across calls and analyzer instances.
+    
+    The sweep only reads class-level tables, so the class (not an instance)
+    is part of the key: no instance is kept alive by the cache.
+    """
+    return analyzer_cls._sweep_roots(unique_notes, notes_below, notes_above)
+
+
+def _build_maqam_index(maqam_structure):
+    """
+    Reverse index (jins1, jins2) -> (maqam, is_variant).
+    
+    Built in table order with setdefault so the first structure matching
+    either its jins2 or alt_jins2 wins, exactly as the old linear scan did.
+    """
+    index = {}
+    for maqam_name, structure in maqam_structure.items():
+        index.setdefault((structure["jins1"], structure["jins2"]), (maqam_name, False))
+        if "alt_jins2" in structure:
+            index.setdefault((structure["jins1"], structure["alt_jins2"]), (maqam_name, True))
+    return types.MappingProxyType(index)
+
+
 class JinsAnalyzer:
     """Analyzes pitch sequences to identify jins patterns based on MaqamWorld data."""
     
+    # The tables are frozen module data, shared by every analyzer
+    jins_library = JINS_LIBRARY
+    maqam_structure = MAQAM_STRUCTURE
+    _maqam_index = _build_maqam_index(MAQAM_STRUCTURE)
+    
+    # Try different jins2 roots common in maqam music
+    # 12 = dim 4th (Saba), 15 = P4, 18 = tritone, 21 = P5
+    jins2_roots = (12, 15, 18, 21)
+    
     def __init__(self, bins_per_octave=36):
         self.bins_per_octave = bins_per_octave
-        self.jins_library = JINS_LIBRARY
-        self.maqam_structure = MAQAM_STRUCTURE
     
     def match_jins(self, note_sequence, tolerance=2):
         """
         Match a note sequence to the most likely jins.
         
         Args:
-            note_sequence: Array of bin indices (0-35) representing notes
+            note_sequence: Array of bin indices (0-35) representing notes (ideally np.int8)
             tolerance: How many bins of deviation allowed for matching
             
         Returns:
@@ -539,53 +829,26 @@ class JinsAnalyzer:
             return {"jins": "Unknown", "confidence": 0.0}
         
         # Get unique notes in sequence (scale degrees used)
-        unique_notes = sorted(set(note_sequence))
-        
-        best_match = None
-        best_score = 0
+        unique_notes = tuple(np.unique(np.ascontiguousarray(note_sequence, dtype=np.int8)).tolist())
         
-        for jins_name, jins_data in self.jins_library.items():
-            jins_intervals = jins_data.get("intervals_bins", [])
-            if not jins_intervals:
-                continue
-            
-            # Check how many jins intervals are present in the sequence
-            matches = 0
-            for interval in jins_intervals:
-                for note in unique_notes:
-                    if abs(note - interval) <= tolerance:
-                        matches += 1
-                        break
-            
-            score = matches / len(jins_intervals)
-            if score > best_score:
-                best_score = score
-                best_match = jins_name
-        
-        return {"jins": best_match or "Unknown", "confidence": best_score}
+        return _match_note_set(unique_notes, len(note_sequence), int(tolerance)).to_dict()
     
     def segment_into_jins(self, sequence, jins2_root=15):
         """
         Split a sequence into jins1 (lower) and jins2 (upper) regions.
         
         Args:
-            sequence: Full normalized sequence (0 = tonic)
+            sequence: Full normalized sequence (0 = tonic), stored as np.int8
             jins2_root: Where jins2 starts (default: 15 = perfect 4th)
             
         Returns:
             Tuple of (jins1_sequence, jins2_sequence)
         """
-        jins1_notes = []
-        jins2_notes = []
-        
-        for note in sequence:
-            if note < jins2_root:
-                jins1_notes.append(note)
-            else:
-                # Normalize jins2 notes relative to jins2 root
-                jins2_notes.append(note - jins2_root)
+        seq = np.ascontiguousarray(sequence, dtype=np.int8)
+        above = seq >= jins2_root
         
-        return np.array(jins1_notes), np.array(jins2_notes)
+        # Normalize jins2 notes relative to jins2 root
+        return seq[~above], seq[above] - np.int8(jins2_root)
     
     def predict_maqam_from_jins(self, jins1_match, jins2_match):
         """
@@ -598,71 +861,70 @@ class JinsAnalyzer:
         Returns:
             Predicted maqam name and confidence
         """
-        jins1_name = jins1_match["jins"]
-        jins2_name = jins2_match["jins"]
+        return self._predict_maqam(
+            JinsMatch(jins1_match["jins"], jins1_match["confidence"]),
+            JinsMatch(jins2_match["jins"], jins2_match["confidence"])
+        ).to_dict()
+    
+    @classmethod
+    def _predict_maqam(cls, jins1_match, jins2_match):
+        """predict_maqam_from_jins on JinsMatch records, returning a MaqamPrediction."""
+        jins1_name = jins1_match.name
+        jins2_name = jins2_match.name
         
-        # First try exact matches
-        for maqam_name, structure in self.maqam_structure.items():
-            if structure["jins1"] == jins1_name:
-                if structure["jins2"] == jins2_name:
-                    confidence = (jins1_match["confidence"] + jins2_match["confidence"]) / 2
-                    return {
-                        "maqam": maqam_name,
-                        "jins1": jins1_name,
-                        "jins2": jins2_name,
-                        "confidence": confidence,
-                        "family": structure.get("family", "Unknown")
-                    }
-                # Check alternative jins2
-                if structure.get("alt_jins2") == jins2_name:
-                    confidence = (jins1_match["confidence"] + jins2_match["confidence"]) / 2 * 0.9
-                    return {
-                        "maqam": maqam_name,
-                        "jins1": jins1_name,
-                        "jins2": jins2_name,
-                        "confidence": confidence,
-                        "family": structure.get("family", "Unknown"),
-                        "variant": True
-                    }
+        # First try exact matches (then the alternative jins2)
+        indexed = cls._maqam_index.get((jins1_name, jins2_name))
+        if indexed is not None:
+            maqam_name, is_variant = indexed
+            structure = cls.maqam_structure[maqam_name]
+            confidence = (jins1_match.confidence + jins2_match.confidence) / 2
+            return MaqamPrediction(
+                maqam_name,
+                jins1_name,
+                jins2_name,
+                confidence * 0.9 if is_variant else confidence,
+                structure.get("family", "Unknown"),
+                variant=is_variant
+            )
         
         # No exact match, return best guess based on jins1 family
-        family = self.jins_library.get(jins1_name, {}).get("family", "Unknown")
-        return {
-            "maqam": f"{jins1_name}-based",
-            "jins1": jins1_name,
-            "jins2": jins2_name,
-            "confidence": jins1_match["confidence"] * 0.6,
-            "family": family
-        }
+        family = cls.jins_library.get(jins1_name, {}).get("family", "Unknown")
+        return MaqamPrediction(
+            _FALLBACK_NAMES.get(jins1_name) or f"{jins1_name}-based",
+            jins1_name,
+            jins2_name,
+            jins1_match.confidence * 0.6,
+            family
+        )
     
     def analyze_full_sequence(self, sequence):
         """
         Full analysis pipeline: segment and identify both jins.
         """
-        # Try different jins2 roots common in maqam music
-        # 12 = dim 4th (Saba), 15 = P4, 18 = tritone, 21 = P5
-        jins2_roots = [12, 15, 18, 21]
+        # One histogram answers, for every root, how many notes fall on each
+        # side (two cumulative-sum lookups) and which distinct notes are used
+        seq = np.ascontiguousarray(sequence, dtype=np.int8)
+        counts = np.bincount(seq, minlength=self.bins_per_octave)
+        notes_below = np.concatenate(([0], np.cumsum(counts)))[list(self.jins2_roots)]
+        notes_above = len(seq) - notes_below
         
         best_result = None
-        best_confidence = 0
         
-        for root in jins2_roots:
-            jins1_seq, jins2_seq = self.segment_into_jins(sequence, root)
-            
-            if len(jins1_seq) < 3 or len(jins2_seq) < 2:
-                continue
-                
-            jins1_match = self.match_jins(jins1_seq)
-            jins2_match = self.match_jins(jins2_seq)
-            
-            result = self.predict_maqam_from_jins(jins1_match, jins2_match)
-            
-            if result["confidence"] > best_confidence:
-                best_confidence = result["confidence"]
-                best_result = result
-                best_result["jins2_root"] = root
+        # Skip the sweep entirely when no root leaves enough notes on both sides.
+        # The sweep only sees the distinct notes and how many notes (capped at 3)
+        # fall on each side of every root, so overlapping windows from a pitch
+        # tracker usually hit the cache instead of re-running it
+        if ((notes_below >= 3) & (notes_above >= 2)).any():
+            best_result = _sweep_roots_cached(
+                type(self),
+                tuple(np.flatnonzero(counts).tolist()),
+                tuple(np.minimum(notes_below, 3).tolist()),
+                tuple(np.minimum(notes_above, 3).tolist()),
+            )
         
-        return best_result or {
+        if best_result is not None:
+            return best_result.to_dict()
+        return {
             "maqam": "Unknown",
             "jins1": "Unknown", 
             "jins2": "Unknown",
@@ -670,6 +932,41 @@ class JinsAnalyzer:
             "family": "Unknown"
         }
     
+    @classmethod
+    def _sweep_roots(cls, unique_notes, notes_below, notes_above):
+        """
+        Best maqam over jins2_roots for one note set, or None.
+        
+        Args:
+            unique_notes: Sorted tuple of the distinct bins in the sequence
+            notes_below: Per root, how many notes lie below it (capped at 3)
+            notes_above: Per root, how many notes lie at or above it (capped at 3)
+            
+        Returns:
+            MaqamPrediction shared through the cache, so callers must not mutate it
+        """
+        best_result = None
+        best_confidence = 0
+        splits = np.searchsorted(unique_notes, cls.jins2_roots).tolist()
+        
+        for root, split, n_jins1, n_jins2 in zip(cls.jins2_roots, splits, notes_below, notes_above):
+            if n_jins1 < 3 or n_jins2 < 2:
+                continue
+            
+            jins1_notes = unique_notes[:split]
+            jins2_notes = tuple(note - root for note in unique_notes[split:])
+            jins1_match = _match_note_set(jins1_notes, n_jins1)
+            jins2_match = _match_note_set(jins2_notes, n_jins2)
+            
+            result = cls._predict_maqam(jins1_match, jins2_match)
+            
+            if result.confidence > best_confidence:
+                best_confidence = result.confidence
+                best_result = result
+                best_result.jins2_root = root
+        
+        return best_result
+    
     def get_maqam_scale(self, maqam_name):
         """
         Get the full scale (in 36-bin indices) for a maqam.
@@ -679,7 +976,7 @@ class JinsAnalyzer:
         """
         structure = self.maqam_structure.get(maqam_name)
         if structure and "scale_bins" in structure:
-            return structure["scale_bins"]
+            return list(structure["scale_bins"])
         return None
     
     def get_jins_intervals(self, jins_name):
@@ -692,8 +989,8 @@ class JinsAnalyzer:
         jins = self.jins_library.get(jins_name)
         if jins:
             return {
-                "steps": jins.get("intervals_steps", []),
-                "bins": jins.get("intervals_bins", []),
+                "steps": list(jins.get("intervals_steps", [])),
+                "bins": list(jins.get("intervals_bins", [])),
                 "size": jins.get("size", 0)
             }
         return None
@@ -3,6 +3,14 @@ import pickle
 import os
 from sklearn.neural_network import MLPClassifier as SklearnMLP
 
+# Hidden-layer activations supported by the NumPy forward pass (sklearn names)
+_ACTIVATIONS = {
+    'relu': lambda x: np.maximum(x, 0, out=x),
+    'tanh': np.tanh,
+    'logistic': lambda x: 1.0 / (1.0 + np.exp(-x)),
+    'identity': lambda x: x,
+}
+
 class MLPClassifier:
     """
     Feed-Forward Neural Network for Maqam Classification.
@@ -12,6 +20,7 @@ class MLPClassifier:
         self.model_path = model_path
         self.model = None
         self.classes_ = []
+        self._weights = None
         self._load_model()
 
     def _load_model(self):
@@ -20,6 +29,7 @@ class MLPClassifier:
                 saved_data = pickle.load(f)
                 self.model = saved_data['model']
                 self.classes_ = saved_data['classes']
+                self._export_weights()
                 print(f"Loaded MLP Model with classes: {self.classes_}")
         else:
             print("No MLP model found. Initializing new classifier.")
@@ -37,6 +47,14 @@ class MLPClassifier:
         """
         self.model.fit(X_train, y_train)
         self.classes_ = self.model.classes_
+        self._export_weights()
+        
+        # The NumPy forward pass must reproduce sklearn; otherwise keep sklearn's
+        if self._weights is not None:
+            reference = self.model.predict_proba(X_train)
+            if not np.allclose(self._forward(X_train), reference, atol=1e-4):
+                print("Warning: NumPy MLP forward pass disagrees with sklearn; using sklearn for inference.")
+                self._weights = None
         
         # Save
         with open(self.model_path, 'wb') as f:
@@ -50,12 +68,77 @@ class MLPClassifier:
         if not self.is_trained():
             return {}
 
-        # Flatten 36x36 -> 1296 features
-        features = transition_matrix.flatten().reshape(1, -1)
-        
-        probs = self.model.predict_proba(features)[0]
+        probs = self.predict_proba_batch([transition_matrix])[0]
         return {cls: prob for cls, prob in zip(self.classes_, probs)}
 
+    def predict_proba_batch(self, transition_matrices):
+        """
+        Predicts probabilities for many transition matrices in one call.
+        Stacks (B, 36, 36) -> (B, 1296) so sklearn runs one GEMM per layer
+        instead of one GEMV per sample.
+        
+        Returns:
+            (B, K) probability array; columns follow self.classes_
+        """
+        if not self.is_trained():
+            return np.zeros((len(transition_matrices), 0))
+        if len(transition_matrices) == 0:
+            return np.zeros((0, len(self.classes_)))
+
+        features = np.asarray(transition_matrices).reshape(len(transition_matrices), -1)
+        if self._weights is None:
+            return self.model.predict_proba(features)
+        return self._forward(features)
+
+    def predict_labels(self, transition_matrices):
+        """
+        Most probable class for each transition matrix.
+        One argmax over the batch probabilities instead of building and
+        scanning a per-class dict per matrix; None when untrained.
+        """
+        if not self.is_trained():
+            return [None] * len(transition_matrices)
+        if len(transition_matrices) == 0:
+            return []
+
+        best = self.predict_proba_batch(transition_matrices).argmax(axis=1)
+        return [self.classes_[idx] for idx in best.tolist()]
+
+    def _export_weights(self):
+        """
+        Copy the fitted layers out of sklearn as float32 (W, b) pairs so
+        inference can skip sklearn's per-call validation stack.
+        """
+        self._weights = None
+        if not self.is_trained() or self.model.activation not in _ACTIVATIONS:
+            return
+        if self.model.out_activation_ not in ('softmax', 'logistic'):
+            return
+        self._weights = [
+            (np.ascontiguousarray(W, dtype=np.float32), np.asarray(b, dtype=np.float32))
+            for W, b in zip(self.model.coefs_, self.model.intercepts_)
+        ]
+
+    def _forward(self, features):
+        """Plain NumPy equivalent of sklearn's MLPClassifier.predict_proba."""
+        x = np.asarray(features, dtype=np.float32)
+        hidden_activation = _ACTIVATIONS[self.model.activation]
+        for W, b in self._weights[:-1]:
+            x = hidden_activation(x @ W + b)
+        
+        W, b = self._weights[-1]
+        logits = x @ W + b
+        
+        if self.model.out_activation_ == 'softmax':
+            logits -= logits.max(axis=1, keepdims=True)
+            np.exp(logits, out=logits)
+            logits /= logits.sum(axis=1, keepdims=True)
+            return logits.astype(np.float64)
+        
+        # Binary models have a single logistic output; sklearn reports [1 - p, p]
+        p = 1.0 / (1.0 + np.exp(-logits[:, 0].astype(np.float64)))
+        return np.column_stack([1.0 - p, p])
+
     def is_trained(self):
         # Sklearn models usually have 'coefs_' attribute after fitting
         return hasattr(self.model, 'coefs_')
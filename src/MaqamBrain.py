@@ -25,11 +25,15 @@ class MaqamBrain:
     Now powered by a pre-trained Keras CNN model.
     """
     
-    def __init__(self, model_path, bins_per_octave=36):
+    def __init__(self, model_path, bins_per_octave=36, verbose=False):
         self.model_path = model_path
         self.model = None
         self.output_classes = 8
+        self.verbose = verbose  # print per-prediction details (stats, label, scores)
         self._load_model()
+        
+        # Score labels per CNN output index, resolved once instead of per prediction
+        self._class_names = tuple(MAQAM_MAPPING.get(i, str(i)) for i in range(self.output_classes))
 
         # Initialize Markov Brain components
         self.processor = SignalProcessor()
@@ -59,44 +63,66 @@ class MaqamBrain:
             return self.predict_markov_file(file_path)
             
         # Default to CNN
+        return self.predict_batch([file_path])[0]
+
+    def predict_batch(self, file_paths):
+        """
+        CNN prediction for several audio files with a single model call.
+        Returns one predict_file-style result per path, in order.
+        """
         if self.model is None:
-            return {"prediction": "Model Error", "confidence": 0.0, "details": "Model not loaded"}
+            return [{"prediction": "Model Error", "confidence": 0.0, "details": "Model not loaded"}
+                    for _ in file_paths]
 
+        results = [None] * len(file_paths)
         try:
-            # 1. Preprocess
-            features = self._extract_features(file_path)
-            if features is None:
-                 return {"prediction": "Processing Error", "confidence": 0.0, "details": "Could not extract features"}
-            
-            # 2. Reshape for CNN (Batch, Mels, Time, Channels)
-            # Model expects (None, 60, 358, 1) based on analysis
-            features = features.reshape(1, 60, 358, 1)
-            
-            # 3. Predict
-            pred_probs = self.model.predict(features, verbose=0)[0]
-            pred_class_idx = np.argmax(pred_probs)
-            confidence = float(pred_probs[pred_class_idx])
+            # 1. Preprocess every file straight into its slot of the CNN batch
+            # (Batch, Mels, Time, Channels); model expects (None, 60, 358, 1).
+            # Failures get their own result and their slot is reused.
+            batch = np.zeros((len(file_paths), 60, 358, 1), dtype=np.float32)
+            rows = []
+            for row, file_path in enumerate(file_paths):
+                slot = batch[len(rows), :, :, 0]
+                if self._extract_features(file_path, out=slot) is None:
+                    results[row] = {"prediction": "Processing Error", "confidence": 0.0, "details": "Could not extract features"}
+                else:
+                    rows.append(row)
+            
+            if rows:
+                # 2. Predict: one direct call instead of model.predict per file
+                batch_probs = np.asarray(self.model(batch[:len(rows)], training=False))
+                for row, pred_probs in zip(rows, batch_probs):
+                    results[row] = self._format_cnn_prediction(pred_probs)
+            
+            return results
             
-            predicted_maqam = MAQAM_MAPPING.get(pred_class_idx, f"Unknown ({pred_class_idx})")
-            
-            # Create scores dict
-            scores = {MAQAM_MAPPING.get(i, str(i)): float(prob) for i, prob in enumerate(pred_probs)}
+        except Exception as e:
+            print(f"Prediction error: {e}")
+            return [result or {"prediction": "Error", "confidence": 0.0, "details": str(e)}
+                    for result in results]
+
+    def _format_cnn_prediction(self, pred_probs):
+        """Turn one row of CNN class probabilities into the API result dict."""
+        pred_class_idx = int(np.argmax(pred_probs))
+        confidence = float(pred_probs[pred_class_idx])
+        
+        predicted_maqam = MAQAM_MAPPING.get(pred_class_idx, f"Unknown ({pred_class_idx})")
+        
+        # Create scores dict
+        scores = dict(zip(self._class_names, pred_probs.tolist()))
+        if self.verbose:
             import json
             print(f"Prediction: {predicted_maqam} ({confidence:.2f})")
             print(f"Scores: {json.dumps(scores, indent=2)}")
-            
-            return {
-                "prediction": predicted_maqam,
-                "confidence": confidence,
-                "scores": scores,
-                "jins_analysis": {"jins1": "N/A", "jins2": "N/A"} # Legacy support
-            }
-            
-        except Exception as e:
-            print(f"Prediction error: {e}")
-            return {"prediction": "Error", "confidence": 0.0, "details": str(e)}
+        
+        return {
+            "prediction": predicted_maqam,
+            "confidence": confidence,
+            "scores": scores,
+            "jins_analysis": {"jins1": "N/A", "jins2": "N/A"} # Legacy support
+        }
 
-    def _extract_features(self, audio_path, target_shape=(60, 358)):
+    def _extract_features(self, audio_path, target_shape=(60, 358), out=None):
         """
         Extract Mel Spectrogram features matching the training:
         - sr=22050
@@ -104,6 +130,9 @@ class MaqamBrain:
         - n_mels=60
         - n_fft=2048
         - hop_length=512
+        
+        Writes into out (a float32 target_shape array, e.g. one slot of a
+        CNN batch) when given; returns the features or None on failure.
         """
         try:
             # Load audio, ensure mono
@@ -123,30 +152,29 @@ class MaqamBrain:
             )
             
             # Convert to Log Scale (dB)
-            mel_spec_db = librosa.power_to_db(mel_spec, ref=np.max)
-            
-            # Fix Time Dimension to 358
-            current_width = mel_spec_db.shape[1]
-            target_width = target_shape[1]
+            mel_spec_db_full = librosa.power_to_db(mel_spec, ref=np.max)
             
-            if current_width < target_width:
-                # Pad with zeros
-                pad_width = target_width - current_width
-                mel_spec_db = np.pad(mel_spec_db, ((0, 0), (0, pad_width)), mode='constant')
+            # Fix Time Dimension to 358: crop into the zero-filled float32 output
+            if out is None:
+                mel_spec_db = np.zeros(target_shape, dtype=np.float32)
             else:
-                # Crop
-                mel_spec_db = mel_spec_db[:, :target_width]
+                mel_spec_db = out
+                mel_spec_db.fill(0)
+            width = min(mel_spec_db_full.shape[1], target_shape[1])
+            mel_spec_db[:, :width] = mel_spec_db_full[:, :width]
                 
-            # Normalize (Min-Max to 0-1 range)
+            # Normalize (Min-Max to 0-1 range), in place
             # This is critical if the model was trained with normalized data
             min_val = mel_spec_db.min()
             max_val = mel_spec_db.max()
             if max_val - min_val > 0:
-                mel_spec_db = (mel_spec_db - min_val) / (max_val - min_val)
+                np.subtract(mel_spec_db, min_val, out=mel_spec_db)
+                np.divide(mel_spec_db, max_val - min_val, out=mel_spec_db)
             else:
-                mel_spec_db = np.zeros_like(mel_spec_db)
+                mel_spec_db.fill(0)
             
-            print(f"Spectrogram Stats - Min: {min_val:.2f}, Max: {max_val:.2f}, Mean: {mel_spec_db.mean():.2f}")
+            if self.verbose:
+                print(f"Spectrogram Stats - Min: {min_val:.2f}, Max: {max_val:.2f}, Mean: {mel_spec_db.mean():.2f}")
                 
             return mel_spec_db
             
@@ -1,7 +1,15 @@
 import os
+import itertools
+import multiprocessing
 import numpy as np
 import json
 
+try:
+    import orjson
+    ORJSON_AVAILABLE = True
+except ImportError:
+    ORJSON_AVAILABLE = False
+
 try:
     from .MLPClassifier import MLPClassifier
     from .JinsLibrary import MAQAM_STRUCTURE, JinsAnalyzer
@@ -9,6 +17,31 @@ except ImportError:
     from MLPClassifier import MLPClassifier
     from JinsLibrary import MAQAM_STRUCTURE, JinsAnalyzer
 
+
+def _extract_sequence(args):
+    """
+    Feature extraction for one file or in-memory signal (top-level so a Pool
+    can pickle it). sr is only used for signals and may be None.
+    
+    Returns the normalized sequence, None for empty/short audio, or the
+    exception raised so the parent can report it like an in-process failure.
+    """
+    source, sr, processor, finder, normalizer = args
+    try:
+        # 1. Signal Processing
+        chroma = processor.get_chromagram(source, sr=sr)
+        if chroma.shape[1] < 2:
+            return None  # Skip empty/short
+        
+        # 2. Find Rukooz
+        rukooz = finder.find_rukooz(chroma)
+        
+        # 3. Normalize Sequence
+        return normalizer.normalize(chroma, rukooz)
+    except Exception as e:
+        return e
+
+
 class MaqamTrainer:
     """
     Training Engine for Jins-Based MaqamDetector 2.0.
@@ -20,9 +53,12 @@ class MaqamTrainer:
     - Separate Markov models for jins1 and jins2
     """
 
-    def __init__(self, bins_per_octave=36):
+    def __init__(self, bins_per_octave=36, n_workers=1):
         self.bins_per_octave = bins_per_octave
         
+        # Processes used for feature extraction in train_on_folder (1 = in-process)
+        self.n_workers = n_workers
+        
         # Markov Counts: { "MaqamName": 36x36_matrix } for overall maqam
         self.markov_counts = {}
         
@@ -30,7 +66,7 @@ class MaqamTrainer:
         self.jins_counts = {}
         
         # MLP Training Data
-        self.X_train = []  # List of flattened transition matrices
+        self.X_train = np.empty((0, bins_per_octave * bins_per_octave))  # Flattened transition matrices, one row per file
         self.y_train = []  # List of labels
         
         # Jins analyzer for segmentation
@@ -41,6 +77,61 @@ class MaqamTrainer:
 
     def train_on_folder(self, maqam_name, folder_path, processor, finder, normalizer):
         """Processes all audio files in a folder."""
+        self.train_on_folders([(maqam_name, folder_path)], processor, finder, normalizer)
+
+    def train_on_folders(self, folders, processor, finder, normalizer):
+        """
+        train_on_folder for several (maqam_name, folder_path) pairs.
+        
+        All files of all folders go through one extraction pass (one worker
+        pool when n_workers > 1), so workers never idle at a folder's tail
+        waiting for the next folder to start. Folders are accumulated in order.
+        """
+        jobs = []
+        all_tasks = []
+        for maqam_name, folder_path in folders:
+            count_targets = self._count_targets(maqam_name)
+            
+            if not os.path.exists(folder_path):
+                print(f"Error: Folder {folder_path} not found.")
+                continue
+            
+            # scandir hands back names and paths (and cached file types) in one pass
+            with os.scandir(folder_path) as entries:
+                audio_files = [entry for entry in entries
+                               if entry.name.lower().endswith(self.audio_extensions) and entry.is_file()]
+            jobs.append((maqam_name, count_targets, [entry.name for entry in audio_files]))
+            all_tasks.extend((entry.path, None, processor, finder, normalizer) for entry in audio_files)
+        
+        sequences = self._extract_sequences(all_tasks)
+        try:
+            for maqam_name, count_targets, filenames in jobs:
+                print(f"Training: Processing {maqam_name}...")
+                self._accumulate_sequences(maqam_name, count_targets, filenames,
+                                           itertools.islice(sequences, len(filenames)))
+        finally:
+            sequences.close()
+
+    def train_on_arrays(self, maqam_name, audio, lengths, processor, finder, normalizer, sr=None):
+        """
+        Same as train_on_folder, for signals already in memory.
+        
+        Args:
+            audio: (n_samples, max_len) zero-padded signals, e.g. from
+                SyntheticDataGenerator.generate_maqam_batch
+            lengths: Valid length of each row
+            sr: Sample rate of audio (processor.sr if None)
+        """
+        count_targets = self._count_targets(maqam_name)
+        print(f"Training: Processing {maqam_name} ({len(lengths)} in-memory samples)...")
+        
+        labels = [f"{maqam_name} sample {i}" for i in range(len(lengths))]
+        tasks = [(row[:length], sr, processor, finder, normalizer) for row, length in zip(audio, lengths)]
+        
+        self._accumulate_sequences(maqam_name, count_targets, labels, self._extract_sequences(tasks))
+
+    def _count_targets(self, maqam_name):
+        """Count matrices a maqam's files update: (maqam counts, jins targets or None)."""
         if maqam_name not in self.markov_counts:
             self.markov_counts[maqam_name] = np.zeros((self.bins_per_octave, self.bins_per_octave))
         
@@ -55,104 +146,114 @@ class MaqamTrainer:
                 self.jins_counts[jins1_name] = np.zeros((self.bins_per_octave, self.bins_per_octave))
             if jins2_name not in self.jins_counts:
                 self.jins_counts[jins2_name] = np.zeros((self.bins_per_octave, self.bins_per_octave))
+            
+            # Bind the target matrices once; the file loop updates them in place
+            jins_targets = (jins2_root, self.jins_counts[jins1_name], self.jins_counts[jins2_name])
         else:
-            jins1_name = jins2_name = None
-            jins2_root = 15
-
-        if not os.path.exists(folder_path):
-            print(f"Error: Folder {folder_path} not found.")
-            return
+            jins_targets = None
+        return self.markov_counts[maqam_name], jins_targets
 
-        print(f"Training: Processing {maqam_name}...")
+    def _accumulate_sequences(self, maqam_name, count_targets, filenames, sequences):
+        """Accumulate counts and MLP rows from _extract_sequence results, one per filename."""
+        maqam_counts, jins_targets = count_targets
         files_processed = 0
         
-        for filename in os.listdir(folder_path):
-            if filename.lower().endswith(self.audio_extensions):
-                file_path = os.path.join(folder_path, filename)
-
-                try:
-                    # 1. Signal Processing
-                    chroma = processor.get_chromagram(file_path)
-                    if chroma.shape[1] < 2: 
-                        continue  # Skip empty/short
-                    
-                    # 2. Find Rukooz
-                    rukooz = finder.find_rukooz(chroma)
-                    
-                    # 3. Normalize Sequence
-                    sequence = normalizer.normalize(chroma, rukooz)
-                    
-                    # 4. Update Maqam-level Markov Counts
-                    file_matrix = np.zeros((self.bins_per_octave, self.bins_per_octave))
-                    
-                    for i in range(len(sequence) - 1):
-                        idx_curr = int(sequence[i]) % self.bins_per_octave
-                        idx_next = int(sequence[i + 1]) % self.bins_per_octave
-                        
-                        self.markov_counts[maqam_name][idx_curr, idx_next] += 1
-                        file_matrix[idx_curr, idx_next] += 1
-                    
-                    # 5. Update Jins-level Markov Counts
-                    if jins1_name and jins2_name:
-                        jins1_seq, jins2_seq = self.jins_analyzer.segment_into_jins(sequence, jins2_root)
-                        
-                        # Learn jins1 transitions
-                        for i in range(len(jins1_seq) - 1):
-                            idx_curr = int(jins1_seq[i]) % self.bins_per_octave
-                            idx_next = int(jins1_seq[i + 1]) % self.bins_per_octave
-                            self.jins_counts[jins1_name][idx_curr, idx_next] += 1
-                        
-                        # Learn jins2 transitions (already normalized relative to jins2 root)
-                        for i in range(len(jins2_seq) - 1):
-                            idx_curr = int(jins2_seq[i]) % self.bins_per_octave
-                            idx_next = int(jins2_seq[i + 1]) % self.bins_per_octave
-                            self.jins_counts[jins2_name][idx_curr, idx_next] += 1
-                    
-                    # 6. Prepare MLP Data
-                    row_sums = file_matrix.sum(axis=1)[:, None]
-                    file_probs = np.divide(file_matrix, row_sums, out=np.zeros_like(file_matrix), where=row_sums!=0)
-                    
-                    self.X_train.append(file_probs.flatten())
-                    self.y_train.append(maqam_name)
+        # One zeroed MLP row per candidate file, filled in place and trimmed at the end
+        bins = self.bins_per_octave
+        folder_rows = np.zeros((len(filenames), bins * bins))
+        
+        for filename, sequence in zip(filenames, sequences):
+            try:
+                # 1-3. Signal Processing, Rukooz, Normalization (possibly in a worker)
+                if isinstance(sequence, Exception):
+                    raise sequence
+                if sequence is None:
+                    continue  # Skip empty/short
+                
+                # 4. Update Maqam-level Markov Counts
+                file_matrix = self._transition_counts(sequence)
+                
+                maqam_counts += file_matrix
+                
+                # 5. Update Jins-level Markov Counts
+                if jins_targets is not None:
+                    jins2_root, jins1_counts, jins2_counts = jins_targets
+                    jins1_seq, jins2_seq = self.jins_analyzer.segment_into_jins(sequence, jins2_root)
                     
-                    files_processed += 1
+                    # Learn jins1 transitions
+                    jins1_counts += self._transition_counts(jins1_seq)
                     
-                except Exception as e:
-                    print(f"Failed to process {filename}: {e}")
-        
+                    # Learn jins2 transitions (already normalized relative to jins2 root)
+                    jins2_counts += self._transition_counts(jins2_seq)
+                
+                # 6. Prepare MLP Data
+                row_sums = file_matrix.sum(axis=1)[:, None]
+                file_probs = folder_rows[files_processed].reshape(bins, bins)
+                np.divide(file_matrix, row_sums, out=file_probs, where=row_sums!=0)
+                
+                self.y_train.append(maqam_name)
+                
+                files_processed += 1
+                
+            except Exception as e:
+                print(f"Failed to process {filename}: {e}")
+    
+        self.X_train = np.concatenate((self.X_train, folder_rows[:files_processed]))
         print(f"  Processed {files_processed} files for {maqam_name}")
 
+    def _extract_sequences(self, tasks):
+        """Yield _extract_sequence results in task order, across a Pool when n_workers > 1."""
+        n_workers = min(self.n_workers or 1, len(tasks))
+        if n_workers <= 1:
+            for task in tasks:
+                yield _extract_sequence(task)
+            return
+        
+        with multiprocessing.Pool(n_workers) as pool:
+            yield from pool.imap(_extract_sequence, tasks)
+
+    def _transition_counts(self, sequence):
+        """36x36 transition counts of a sequence via one bincount over curr*36+next ids."""
+        bins = self.bins_per_octave
+        seq = np.asarray(sequence, dtype=np.int64) % bins
+        transitions = seq[:-1] * bins + seq[1:]
+        return np.bincount(transitions, minlength=bins * bins).reshape(bins, bins).astype(float)
+
+    def _save_models(self, counts, path):
+        """Smooth, row-normalize and write {name: count matrix} as {name: probabilities} JSON."""
+        names = list(counts)
+        if names:
+            # Add smoothing and normalize, all matrices at once
+            smooth = np.stack([counts[name] for name in names]) + 1e-6
+            probs = smooth / smooth.sum(axis=2, keepdims=True)
+        
+        # Compact JSON: orjson serializes the arrays natively, and the stdlib
+        # encoder only runs at C speed without indent
+        if ORJSON_AVAILABLE:
+            library = dict(zip(names, probs)) if names else {}
+            with open(path, 'wb') as f:
+                f.write(orjson.dumps(library, option=orjson.OPT_SERIALIZE_NUMPY))
+        else:
+            library = dict(zip(names, probs.tolist())) if names else {}
+            with open(path, 'w') as f:
+                json.dump(library, f)
+
     def finalize_and_save(self, markov_file="maqam_database_hybrid.json", 
                           jins_file="jins_database.json",
                           mlp_file="mlp_model.pkl"):
         """Saves Markov models (maqam + jins levels) and trains/saves the MLP model."""
         
         # 1. Save Maqam-level Markov Models
-        trained_library = {}
-        for name, matrix in self.markov_counts.items():
-            # Add smoothing and normalize
-            smooth_matrix = matrix + 1e-6
-            prob_matrix = smooth_matrix / smooth_matrix.sum(axis=1)[:, None]
-            trained_library[name] = prob_matrix.tolist()
-
-        with open(markov_file, 'w') as f:
-            json.dump(trained_library, f, indent=4)
+        self._save_models(self.markov_counts, markov_file)
         print(f"Success: Maqam Markov models saved to {markov_file}")
         
         # 2. Save Jins-level Markov Models
         if self.jins_counts:
-            jins_library = {}
-            for name, matrix in self.jins_counts.items():
-                smooth_matrix = matrix + 1e-6
-                prob_matrix = smooth_matrix / smooth_matrix.sum(axis=1)[:, None]
-                jins_library[name] = prob_matrix.tolist()
-            
-            with open(jins_file, 'w') as f:
-                json.dump(jins_library, f, indent=4)
+            self._save_models(self.jins_counts, jins_file)
             print(f"Success: Jins Markov models saved to {jins_file}")
 
         # 3. Train and Save MLP
-        if self.X_train:
+        if len(self.X_train):
             print(f"Training MLP on {len(self.X_train)} samples...")
             mlp = MLPClassifier(model_path=mlp_file)
             mlp.train(self.X_train, self.y_train)
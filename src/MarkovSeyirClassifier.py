@@ -1,5 +1,50 @@
 import numpy as np
 
+try:
+    from .numba_compat import njit, nb_types, NUMBA_AVAILABLE
+except ImportError:
+    from numba_compat import njit, nb_types, NUMBA_AVAILABLE
+
+
+# Shapes are fixed once the models are loaded, so compile the specialised
+# kernels eagerly (or load them from the on-disk cache) instead of on first use:
+# uint8 for SequenceNormalizer output, intp for anything else, each in a
+# read-only variant for cached/frozen sequences
+_SCORE_ALL_SIGNATURES = [
+    nb_types.void(
+        nb_types.Array(nb_types.float32, 3, "C", readonly=True),
+        nb_types.Array(index_type, 1, "C", readonly=readonly),
+        nb_types.float64[::1],
+    )
+    for index_type in (nb_types.uint8, nb_types.intp)
+    for readonly in (False, True)
+] if NUMBA_AVAILABLE else None
+
+
+@njit(_SCORE_ALL_SIGNATURES, cache=True, nogil=True, boundscheck=False)
+def _score_all(log_stack, sequence, out):
+    """Accumulate the log-likelihood of sequence under every maqam into out."""
+    bins = log_stack.shape[1]
+    for t in range(sequence.shape[0] - 1):
+        curr, nxt = np.intp(sequence[t]), np.intp(sequence[t + 1])
+        if curr < 0:
+            curr += bins
+        if nxt < 0:
+            nxt += bins
+        if curr < 0 or curr >= bins or nxt < 0 or nxt >= bins:
+            raise IndexError("sequence bin out of range")
+        for k in range(log_stack.shape[0]):
+            out[k] += log_stack[k, curr, nxt]
+
+
+def _as_index_array(sequence):
+    """uint8 bins stay as they are; anything else becomes intp."""
+    sequence = np.asarray(sequence)
+    if sequence.dtype == np.uint8:
+        return sequence
+    return sequence.astype(np.intp, copy=False)
+
+
 class MarkovSeyirClassifier:
     """
     Step 4: Use Markov Transition Matrices to identify the Maqam.
@@ -11,27 +56,57 @@ class MarkovSeyirClassifier:
     def __init__(self, bins_per_octave=36):
         self.bins_per_octave = bins_per_octave
         self.models = self._initialize_maqam_models()
+        
+        # Stack every model into one (K, 36, 36) tensor so predict scores all
+        # maqamat with a single gather instead of a Python loop per maqam
+        self.markov_names = list(self.models)
+        # float32 halves the gathered bytes; predict still sums in float64
+        if self.models:
+            self.markov_stack = np.ascontiguousarray(np.stack(list(self.models.values())), dtype=np.float32)
+        else:
+            self.markov_stack = np.zeros((0, self.bins_per_octave, self.bins_per_octave), dtype=np.float32)
+        
+        # Log-probabilities are static per model: take the log once here
+        self.log_markov_stack = np.log(self.markov_stack)
+        self.log_markov_stack.flags.writeable = False
 
     def _initialize_maqam_models(self, db_path="maqam_database_hybrid.json"):
         import json
         import os
         
         library = {}
+        cache_path = os.path.splitext(db_path)[0] + ".npz"
+
+        # 1. Prefer the binary cache while it is at least as new as the JSON
+        if os.path.exists(cache_path) and (
+                not os.path.exists(db_path)
+                or os.path.getmtime(cache_path) >= os.path.getmtime(db_path)):
+            try:
+                with np.load(cache_path) as cache:
+                    names = cache["names"].tolist()
+                    matrices = cache["matrices"]
+                library = dict(zip(names, matrices))
+                print(f"Loaded {len(library)} models from {cache_path}")
+                return library
+            except Exception as e:
+                print(f"Warning: Failed to load {cache_path}: {e}")
+                library = {}
 
-        # 1. Try to load from JSON
+        # 2. Try to load from JSON
         if os.path.exists(db_path):
             try:
                 with open(db_path, "r") as f:
                     data = json.load(f)
                 # Convert lists back to numpy arrays
                 for name, matrix_list in data.items():
-                    library[name] = np.array(matrix_list)
+                    library[name] = np.ascontiguousarray(matrix_list, dtype=np.float32)
                 print(f"Loaded {len(library)} models from {db_path}")
+                self._save_markov_cache(library, cache_path)
                 return library
             except Exception as e:
                 print(f"Warning: Failed to load {db_path}: {e}")
 
-        # 2. Fallback to hardcoded examples if no DB found (36-bin)
+        # 3. Fallback to hardcoded examples if no DB found (36-bin)
         print("Warning: No database found. Using hardcoded 36-bin examples.")
         
         # Example: Bayati Transition Matrix (36-bin)
@@ -53,14 +128,36 @@ class MarkovSeyirClassifier:
         
         return library
 
+    def _save_markov_cache(self, library, cache_path):
+        """One-time conversion of the JSON database to a stacked float32 .npz."""
+        if not library:
+            return
+        try:
+            np.savez(cache_path,
+                     names=np.array(list(library)),
+                     matrices=np.stack(list(library.values())).astype(np.float32))
+        except Exception as e:
+            print(f"Warning: Could not write {cache_path}: {e}")
+
     def predict(self, sequence):
-        results = {}
-        for name, matrix in self.models.items():
-            log_likelihood = 0
-            for i in range(len(sequence) - 1):
-                p = matrix[sequence[i], sequence[i + 1]]
-                log_likelihood += np.log(p)
-            results[name] = log_likelihood
-
-        best_fit = max(results, key=results.get)
-        return best_fit, results
\ No newline at end of file
+        """
+        Score a normalized sequence against the maqam models.
+        
+        Args:
+            sequence: Bin indices relative to the tonic
+        """
+        names, log_stack = self.markov_names, self.log_markov_stack
+        
+        sequence = _as_index_array(sequence)
+        if NUMBA_AVAILABLE:
+            log_likelihoods = np.zeros(len(names))
+            _score_all(log_stack, np.ascontiguousarray(sequence), log_likelihoods)
+        else:
+            curr, nxt = sequence[:-1], sequence[1:]
+            
+            # (K, N-1) log transition probabilities for every maqam at once
+            log_likelihoods = log_stack[:, curr, nxt].sum(axis=1, dtype=np.float64)
+        results = dict(zip(names, log_likelihoods.tolist()))
+
+        best_fit = names[int(np.argmax(log_likelihoods))]
+        return best_fit, results
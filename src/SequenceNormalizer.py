@@ -10,6 +10,13 @@ class SequenceNormalizer:
         raw_sequence = np.argmax(chromagram, axis=0)
         
         # Shift every note so that Rukooz = 0 (Transposition)
-        # This makes the model key-invariant.
-        normalized_sequence = (raw_sequence - rukooz_index) % self.bins_per_octave
-        return normalized_sequence
\ No newline at end of file
+        # This makes the model key-invariant. Done in place on the fresh
+        # argmax output, so no temporaries are allocated.
+        np.subtract(raw_sequence, rukooz_index, out=raw_sequence)
+        np.mod(raw_sequence, self.bins_per_octave, out=raw_sequence)
+        
+        # Bins are only ever used as table indices; one byte each is enough
+        # and keeps the Markov gathers' index stream an eighth the size
+        if self.bins_per_octave <= 256:
+            return raw_sequence.astype(np.uint8)
+        return raw_sequence
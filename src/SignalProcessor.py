@@ -1,15 +1,155 @@
+import functools
+import hashlib
+import os
+
 import librosa
 import numpy as np
 
+
+def _cache_key(value):
+    """Hashable stand-in for a filter-basis argument (arrays by content)."""
+    if isinstance(value, np.ndarray):
+        return (value.shape, value.dtype.str, value.tobytes())
+    if isinstance(value, (list, tuple)):
+        return tuple(_cache_key(item) for item in value)
+    if isinstance(value, type):
+        return np.dtype(value).str
+    return value
+
+
+def _memoize_cqt_filters():
+    """
+    Keep librosa's per-octave CQT filter basis in memory between calls.
+    
+    librosa rebuilds it on every cqt() unless LIBROSA_CACHE_DIR is set, and
+    building it is most of the CQT cost on short clips. vqt rescales the
+    returned basis in place, so callers always get a copy.
+    """
+    try:
+        from librosa.core import constantq
+    except ImportError:
+        return
+    if not hasattr(constantq, "__vqt_filter_fft"):
+        return  # Private hook gone in this librosa version: cqt() runs unpatched
+    build_filters = getattr(constantq, "__vqt_filter_fft")
+    if getattr(build_filters, "memoized", False):
+        return
+    
+    cache = {}
+    
+    @functools.wraps(build_filters)
+    def cached_filters(*args, **kwargs):
+        key = (_cache_key(args), _cache_key(sorted(kwargs.items())))
+        # Single get/set so a concurrent clear() from another thread can't drop the entry mid-lookup
+        filters = cache.get(key)
+        if filters is None:
+            if len(cache) >= 128:
+                cache.clear()
+            filters = cache[key] = build_filters(*args, **kwargs)
+        basis, n_fft, lengths = filters
+        return basis.copy(), n_fft, lengths.copy()
+    
+    cached_filters.memoized = True
+    setattr(constantq, "__vqt_filter_fft", cached_filters)
+
+
+_memoize_cqt_filters()
+
+
+def _compute_chromagram(y, sr, bins_per_octave, n_bins, cqt_hpss=False, hop_length=512):
+    """
+    HPSS -> CQT -> chroma for a loaded signal.
+    
+    With cqt_hpss the harmonic/percussive split runs on the CQT magnitude
+    instead of the waveform, skipping HPSS's own STFT/iSTFT round trip.
+    """
+    # 1. HPSS: Isolate Harmonic component (melody) from Percussive (rhythm/noise)
+    y_harmonic = y if cqt_hpss else librosa.effects.hpss(y)[0]
+    
+    # 2. CQT: High-resolution pitch analysis on the harmonic component
+    # (complex64 keeps the CQT and its magnitude in single precision)
+    cqt = np.abs(librosa.cqt(y_harmonic, sr=sr, 
+                             bins_per_octave=bins_per_octave, 
+                             n_bins=n_bins,
+                             hop_length=hop_length,
+                             dtype=np.complex64))
+    if cqt_hpss:
+        cqt = librosa.decompose.hpss(cqt)[0]
+                             
+    # 3. Chroma: Fold into a single octave (Pitch Class Profile)
+    chroma = librosa.feature.chroma_cqt(C=cqt, 
+                                        bins_per_octave=bins_per_octave,
+                                        n_octaves=7)
+                                        
+    return chroma
+
+
+def _disk_cache_path(cache_dir, audio_path, settings):
+    """cache_dir/{sha1}.npz, hashed over the file's bytes and the analysis settings."""
+    digest = hashlib.sha1(repr(settings).encode())
+    with open(audio_path, 'rb') as f:
+        for block in iter(lambda: f.read(1 << 20), b''):
+            digest.update(block)
+    return os.path.join(cache_dir, f"{digest.hexdigest()}.npz")
+
+
+@functools.lru_cache(maxsize=16)
+def _chromagram_from_file(audio_path, mtime_ns, size, sr, bins_per_octave, n_bins, cqt_hpss, hop_length,
+                          cache_dir=None):
+    """
+    Memoized chromagram of an audio file.
+    
+    mtime_ns and size are part of the key so an edited or replaced file is
+    recomputed. The result is shared between callers, so it is read-only.
+    With cache_dir, chromagrams also persist on disk (float32) across runs.
+    """
+    cache_path = None
+    if cache_dir is not None:
+        settings = (sr, bins_per_octave, n_bins, cqt_hpss, hop_length)
+        cache_path = _disk_cache_path(cache_dir, audio_path, settings)
+        if os.path.exists(cache_path):
+            with np.load(cache_path) as cached:
+                chroma = cached['chroma']
+            chroma.flags.writeable = False
+            return chroma
+    
+    y, _ = librosa.load(audio_path, sr=sr)
+    chroma = _compute_chromagram(y, sr, bins_per_octave, n_bins, cqt_hpss, hop_length)
+    
+    if cache_path is not None:
+        try:
+            os.makedirs(cache_dir, exist_ok=True)
+            # Write then rename so parallel trainers never read a partial file
+            tmp_path = f"{cache_path}.{os.getpid()}.tmp"
+            with open(tmp_path, 'wb') as f:
+                np.savez_compressed(f, chroma=chroma.astype(np.float32, copy=False))
+            os.replace(tmp_path, cache_path)
+        except OSError as e:
+            print(f"Could not cache chromagram for {audio_path}: {e}")
+    
+    chroma.flags.writeable = False
+    return chroma
+
+
 class SignalProcessor:
     """
     Step 1: Advanced Audio Preprocessing.
     - Harmonic-Percussive Source Separation (HPSS) to isolate melody.
     - Constant-Q Transform (CQT) with 36 bins per octave (1/6th tone).
+    
+    cqt_hpss=True separates on the CQT magnitude instead of the waveform:
+    cheaper for short streaming chunks, but not what the models were trained on.
+    hop_length is the CQT frame hop (a multiple of 64 for 7 octaves); larger
+    hops give proportionally fewer frames, but the shipped Markov and MLP
+    models were trained on transitions between 512-sample frames.
+    cache_dir, if given, keeps file chromagrams on disk between runs.
     """
-    def __init__(self, sr=22050, bins_per_octave=36):
+    def __init__(self, sr=22050, bins_per_octave=36, cqt_hpss=False, hop_length=512, cache_dir=None):
         self.sr = sr
         self.bins_per_octave = bins_per_octave
+        self.cqt_hpss = cqt_hpss
+        self.hop_length = hop_length
+        self.cache_dir = cache_dir
         # We want meaningful pitch coverage. 7 octaves is standard for CQT.
         self.n_bins = bins_per_octave * 7 
 
@@ -20,26 +160,21 @@ class SignalProcessor:
         Args:
             audio_path_or_y: Either a file path (str) or a numpy array of audio samples
             sr: Sample rate (optional, uses self.sr if not provided)
+            
+        File paths are memoized on (path, mtime, size): re-analysing the same
+        file returns the cached, read-only chromagram. With cache_dir set the
+        chromagram is also stored as cache_dir/{sha1}.npz and reused next run.
         """
         if isinstance(audio_path_or_y, str):
-            y, _ = librosa.load(audio_path_or_y, sr=self.sr)
-        else:
-            y = audio_path_or_y
-            # Resample if needed
-            if sr is not None and sr != self.sr:
-                y = librosa.resample(y, orig_sr=sr, target_sr=self.sr)
-            
-        # 1. HPSS: Isolate Harmonic component (melody) from Percussive (rhythm/noise)
-        y_harmonic, y_percussive = librosa.effects.hpss(y)
+            stat = os.stat(audio_path_or_y)
+            return _chromagram_from_file(audio_path_or_y, stat.st_mtime_ns, stat.st_size,
+                                         self.sr, self.bins_per_octave, self.n_bins, self.cqt_hpss,
+                                         self.hop_length, self.cache_dir)
         
-        # 2. CQT: High-resolution pitch analysis on the harmonic component
-        cqt = np.abs(librosa.cqt(y_harmonic, sr=self.sr, 
-                                 bins_per_octave=self.bins_per_octave, 
-                                 n_bins=self.n_bins))
-                                 
-        # 3. Chroma: Fold into a single octave (Pitch Class Profile)
-        chroma = librosa.feature.chroma_cqt(C=cqt, 
-                                            bins_per_octave=self.bins_per_octave,
-                                            n_octaves=7)
-                                            
-        return chroma
\ No newline at end of file
+        y = np.asarray(audio_path_or_y, dtype=np.float32)
+        # Resample if needed
+        if sr is not None and sr != self.sr:
+            y = librosa.resample(y, orig_sr=sr, target_sr=self.sr)
+            
+        return _compute_chromagram(y, self.sr, self.bins_per_octave, self.n_bins, self.cqt_hpss,
+                                   self.hop_length)
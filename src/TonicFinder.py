@@ -4,14 +4,34 @@ class TonicFinder:
     """Step 2: Analysis of energy distribution to find the Rukooz (Tonic)."""
     def __init__(self, bins_per_octave=36):
         self.bins_per_octave = bins_per_octave
+        
+        # Running per-bin energy for streaming use (see update)
+        self._energy_sum = None
 
-    def find_rukooz(self, chromagram):
+    def update(self, chroma_chunk):
+        """
+        Add a streamed chromagram chunk to the running per-bin energy.
+        Each chunk costs O(bins * frames) once; find_rukooz() is then O(bins).
+        """
+        chunk_energy = chroma_chunk.sum(axis=1)
+        if self._energy_sum is None:
+            self._energy_sum = chunk_energy.astype(np.float64)
+        else:
+            self._energy_sum += chunk_energy
+
+    def find_rukooz(self, chromagram=None):
         """
         Identifies the tonic bin index (0-35).
+        Without a chromagram, uses the energy accumulated by update().
         """
+        if chromagram is None:
+            if self._energy_sum is None:
+                raise ValueError("No chromagram given and nothing accumulated via update()")
+            return np.argmax(self._energy_sum)
+        
         # Sum energy across time for each of the 36 bins
         energy_per_bin = np.mean(chromagram, axis=1)
         
         # The bin with the highest sustained energy is usually the Rukooz in Maqam music.
         rukooz_index = np.argmax(energy_per_bin)
-        return rukooz_index
\ No newline at end of file
+        return rukooz_index
@@ -5,6 +5,19 @@ import urllib.request
 import zipfile
 import shutil
 import re
+from concurrent.futures import ThreadPoolExecutor
+
+try:
+    from lxml import etree
+    LXML_AVAILABLE = True
+except ImportError:
+    LXML_AVAILABLE = False
+
+try:
+    import ahocorasick
+    AHOCORASICK_AVAILABLE = True
+except ImportError:
+    AHOCORASICK_AVAILABLE = False
 
 # Configuration
 FFMPEG_URL = "https://evermeet.cx/ffmpeg/getrelease/zip"
@@ -22,7 +35,6 @@ ARCHIVE_ITEMS = [
 
 # Maqam Mapping (Filename Keyword -> Directory Name)
 MAQAM_MAP = {
-    "bayati": "Bayati",
     "bayati": "Bayati",
     "rast": "Rast",
     "hijaz": "Hijaz",
@@ -38,6 +50,31 @@ MAQAM_MAP = {
     "ushaq": "Bayati", # Often related
 }
 
+def _build_keyword_automaton():
+    # Values carry the keyword's position in MAQAM_MAP so the earliest entry still wins
+    automaton = ahocorasick.Automaton()
+    for priority, (keyword, maqam) in enumerate(MAQAM_MAP.items()):
+        automaton.add_word(keyword, (priority, maqam))
+    automaton.make_automaton()
+    return automaton
+
+_MAQAM_AUTOMATON = _build_keyword_automaton() if AHOCORASICK_AVAILABLE else None
+
+def identify_maqam(filename):
+    """Directory name for the first MAQAM_MAP keyword found in filename, or None."""
+    if _MAQAM_AUTOMATON is not None:
+        # One pass over the filename for all keywords
+        matches = [value for _, value in _MAQAM_AUTOMATON.iter(filename)]
+        return min(matches)[1] if matches else None
+    
+    for keyword, maqam in MAQAM_MAP.items():
+        if keyword in filename:
+            return maqam
+    return None
+
+# href="...mp3" on archive.org listing pages (regex fallback when lxml is missing)
+_MP3_HREF = re.compile(r'href=["\'](.*?\.mp3)["\']', re.IGNORECASE)
+
 def install_ffmpeg():
     if os.path.exists(FFMPEG_BIN):
         print(f"[+] ffmpeg found at {FFMPEG_BIN}")
@@ -73,19 +110,51 @@ def get_file_links(archive_id):
     print(f"[*] Scanning {url}...")
     try:
         with urllib.request.urlopen(url) as response:
-            html = response.read().decode('utf-8')
+            if LXML_AVAILABLE:
+                # Parse <a> tags straight off the byte stream instead of decoding the whole page
+                links = []
+                for _, element in etree.iterparse(response, tag='a', html=True):
+                    href = element.get('href', '')
+                    if href.lower().endswith('.mp3'):
+                        links.append(href)
+                    element.clear()
+            else:
+                html = response.read().decode('utf-8')
+                links = _MP3_HREF.findall(html)
             
-        # Simple regex to find href="...mp3"
-        links = re.findall(r'href=["\'](.*?\.mp3)["\']', html)
         return [f"{url}/{link}" for link in links if not link.startswith("/")]
     except Exception as e:
         print(f"[-] Failed to scan {archive_id}: {e}")
         return []
 
-def process_files():
+def download_and_convert(task):
+    link, local_mp3, local_wav, target_maqam = task
+    filename = os.path.basename(local_mp3)
+    
+    print(f"[*] Downloading {filename} to {target_maqam}...")
+    try:
+        urllib.request.urlretrieve(link, local_mp3)
+        
+        # Convert
+        print(f"[*] Converting {filename} to WAV...")
+        subprocess.run([FFMPEG_BIN, "-threads", "0", "-i", local_mp3,
+                        "-af", "aresample=resampler=swr", "-ar", "22050", "-ac", "1",
+                        "-c:a", "pcm_s16le", "-f", "wav", local_wav], 
+                     check=True, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+        
+        # Cleanup MP3
+        os.remove(local_mp3)
+        print(f"[+] Processed {filename}")
+        
+    except Exception as e:
+        print(f"[-] Error processing {filename}: {e}")
+
+def process_files(max_workers=8):
     # Update PATH
     os.environ["PATH"] += os.pathsep + BIN_DIR
     
+    tasks = []
+    queued = set()
     for item_id in ARCHIVE_ITEMS:
         links = get_file_links(item_id)
         print(f"[*] Found {len(links)} mp3 files in {item_id}")
@@ -94,11 +163,7 @@ def process_files():
             filename = urllib.parse.unquote(os.path.basename(link)).lower()
             
             # Identify Maqam
-            target_maqam = None
-            for keyword, maqam in MAQAM_MAP.items():
-                if keyword in filename:
-                    target_maqam = maqam
-                    break
+            target_maqam = identify_maqam(filename)
             
             if not target_maqam:
                 continue
@@ -106,32 +171,24 @@ def process_files():
             # Prepare paths
             target_dir = os.path.join(DATA_DIR, target_maqam)
             if not os.path.exists(target_dir):
-                target_dir = os.path.join(DATA_DIR, target_maqam) # Retrying or skipping if folder usually anticipated
                 # We only download if the folder exists (meaning it's a target class)
                 continue
                 
             local_mp3 = os.path.join(target_dir, filename)
             local_wav = local_mp3.replace(".mp3", ".wav")
             
-            if os.path.exists(local_wav):
+            if os.path.exists(local_wav) or local_wav in queued:
                 print(f"[.] Skipping {filename} (already exists)")
                 continue
-                
-            print(f"[*] Downloading {filename} to {target_maqam}...")
-            try:
-                urllib.request.urlretrieve(link, local_mp3)
-                
-                # Convert
-                print(f"[*] Converting to WAV...")
-                subprocess.run([FFMPEG_BIN, "-i", local_mp3, "-ar", "22050", "-ac", "1", local_wav], 
-                             check=True, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
-                
-                # Cleanup MP3
-                os.remove(local_mp3)
-                print(f"[+] Processed {filename}")
-                
-            except Exception as e:
-                print(f"[-] Error processing {filename}: {e}")
+            
+            queued.add(local_wav)
+            tasks.append((link, local_mp3, local_wav, target_maqam))
+    
+    # Downloads are network-bound and ffmpeg runs out of process, so threads
+    # overlap both without contending for the GIL.
+    print(f"[*] Processing {len(tasks)} files with {max_workers} workers...")
+    with ThreadPoolExecutor(max_workers=max_workers) as executor:
+        list(executor.map(download_and_convert, tasks))
 
 if __name__ == "__main__":
     if not os.path.exists(BIN_DIR):
@@ -3,11 +3,14 @@ from fastapi.middleware.cors import CORSMiddleware
 from fastapi.staticfiles import StaticFiles
 from fastapi.responses import JSONResponse
 import uvicorn
-import shutil
 import os
 import numpy as np
+import asyncio
+import base64
+import io
 import json
 import tempfile
+from contextlib import asynccontextmanager
 from pathlib import Path
 
 # Audio processing imports
@@ -23,6 +26,12 @@ try:
 except ImportError:
     SOUNDFILE_AVAILABLE = False
 
+try:
+    import aiofiles
+    AIOFILES_AVAILABLE = True
+except ImportError:
+    AIOFILES_AVAILABLE = False
+
 try:
     from .SignalProcessor import SignalProcessor
     from .TonicFinder import TonicFinder
@@ -38,10 +47,19 @@ except ImportError:
     from MaqamTrainer import MaqamTrainer
     from JinsLibrary import MAQAM_STRUCTURE
 
+@asynccontextmanager
+async def lifespan(app):
+    # The warm-up is blocking CQT work, so it runs in the default thread pool
+    # (like analyze_stream_chunk) instead of on the event loop
+    await asyncio.get_running_loop().run_in_executor(None, warmup)
+    yield
+
+
 app = FastAPI(
     title="Maqam Detector API 2.0",
     description="AI-powered Arabic maqam detection with 36-bin microtonal resolution",
-    version="2.0.0"
+    version="2.0.0",
+    lifespan=lifespan
 )
 
 # CORS for Flutter Web / Any frontend
@@ -63,13 +81,57 @@ MODEL_PATH = '/Users/sezarhanna/Downloads/best_model_music_cnn_pitch.keras'
 brain = MaqamBrain(model_path=MODEL_PATH)
 
 # Legacy components (kept for compatibility if needed)
-processor = SignalProcessor(bins_per_octave=36)
+# File chromagrams persist in cache/ so repeat /train runs skip the CQT
+processor = SignalProcessor(bins_per_octave=36, cache_dir="cache")
+# Live chunks only feed the chromagram display, so skip the waveform HPSS round trip
+stream_processor = SignalProcessor(bins_per_octave=36, cqt_hpss=True)
 finder = TonicFinder(bins_per_octave=36)
 normalizer = SequenceNormalizer(bins_per_octave=36)
 # brain = MaqamBrain(bins_per_octave=36) # Old brain disabled
 
 # Supported audio formats
 SUPPORTED_AUDIO_EXTENSIONS = {'.mp3', '.wav', '.flac', '.m4a', '.ogg', '.aac', '.wma'}
+# Uploads are copied to disk in 1 MB reads
+UPLOAD_CHUNK_SIZE = 1 << 20
+# Leading bytes of the containers soundfile can open from a websocket message
+AUDIO_CONTAINER_MAGIC = (b'RIFF', b'RIFX', b'RF64', b'fLaC', b'OggS', b'FORM')
+
+# MAQAM_STRUCTURE is frozen, so derive the per-request views of it once
+VALID_MAQAMAT = frozenset(MAQAM_STRUCTURE)
+MAQAMAT_RESPONSE = {
+    "maqamat": list(MAQAM_STRUCTURE.keys()),
+    "count": len(MAQAM_STRUCTURE),
+    "structures": {
+        name: {
+            "jins1": struct["jins1"],
+            "jins2": struct["jins2"],
+            "family": struct.get("family", "Unknown")
+        }
+        for name, struct in MAQAM_STRUCTURE.items()
+    }
+}
+
+
+def warmup():
+    """Run one silent second through the pipeline so the first request doesn't pay for JIT/filter setup."""
+    y = np.zeros(22050, dtype=np.float32)
+    for chroma_processor in (processor, stream_processor):
+        chroma = chroma_processor.get_chromagram(y)
+    finder.find_rukooz(chroma)
+    normalizer.normalize(chroma, 0)
+    print("Warmup done")
+
+
+async def save_upload(file: UploadFile, destination) -> None:
+    """Write an upload to disk chunk by chunk, awaiting between reads (and writes, with aiofiles)."""
+    if AIOFILES_AVAILABLE:
+        async with aiofiles.open(destination, "wb") as out:
+            while chunk := await file.read(UPLOAD_CHUNK_SIZE):
+                await out.write(chunk)
+    else:
+        with open(destination, "wb") as out:
+            while chunk := await file.read(UPLOAD_CHUNK_SIZE):
+                out.write(chunk)
 
 
 def load_audio_file(file_path: str) -> tuple:
@@ -103,18 +165,7 @@ def read_root():
 @app.get("/maqamat")
 def get_maqamat():
     """Get list of all supported maqamat with their jins structure."""
-    return {
-        "maqamat": list(MAQAM_STRUCTURE.keys()),
-        "count": len(MAQAM_STRUCTURE),
-        "structures": {
-            name: {
-                "jins1": struct["jins1"],
-                "jins2": struct["jins2"],
-                "family": struct.get("family", "Unknown")
-            }
-            for name, struct in MAQAM_STRUCTURE.items()
-        }
-    }
+    return MAQAMAT_RESPONSE
 
 
 @app.get("/training-stats")
@@ -156,8 +207,8 @@ async def predict(file: UploadFile = File(...), algorithm: str = Form("cnn")):
     
     # Save to temp file (librosa needs a file path)
     with tempfile.NamedTemporaryFile(delete=False, suffix=file_ext) as tmp:
-        shutil.copyfileobj(file.file, tmp)
         temp_path = tmp.name
+    await save_upload(file, temp_path)
     
     try:
         # New Flow: Direct file prediction using Keras Brain
@@ -205,8 +256,8 @@ async def predict_timeline(
     
     # Save to temp file
     with tempfile.NamedTemporaryFile(delete=False, suffix=file_ext) as tmp:
-        shutil.copyfileobj(file.file, tmp)
         temp_path = tmp.name
+    await save_upload(file, temp_path)
     
     try:
         # Load and process audio
@@ -260,13 +311,12 @@ async def contribute_training_data(
     The file will be saved to data/{maqam_name}/ for future training.
     """
     # Validate maqam name
-    valid_maqamat = set(MAQAM_STRUCTURE.keys())
-    if maqam_name not in valid_maqamat:
+    if maqam_name not in VALID_MAQAMAT:
         return JSONResponse(
             status_code=400,
             content={
                 "error": f"Unknown maqam: {maqam_name}",
-                "valid_maqamat": list(valid_maqamat)
+                "valid_maqamat": list(VALID_MAQAMAT)
             }
         )
     
@@ -289,8 +339,7 @@ async def contribute_training_data(
     
     # Save file
     try:
-        with open(file_path, "wb") as buffer:
-            shutil.copyfileobj(file.file, buffer)
+        await save_upload(file, file_path)
         
         return {
             "status": "success",
@@ -362,12 +411,48 @@ async def train(maqam_name: str = Query(None, description="Specific maqam to tra
     }
 
 
+def analyze_stream_chunk(data, stream_finder):
+    """Chunk bytes -> chromagram, running tonic and prediction (runs in a worker thread)."""
+    # Containers (the dashboard uploads whole WAV files) go through soundfile;
+    # anything else is raw float32 LE PCM at 22050 Hz, viewed without a copy
+    if SOUNDFILE_AVAILABLE and data[:4] in AUDIO_CONTAINER_MAGIC:
+        with sf.SoundFile(io.BytesIO(data)) as f:
+            audio_chunk = f.read(dtype='float32')
+            sr = f.samplerate
+    else:
+        audio_chunk = np.frombuffer(data, dtype='<f4', count=len(data) // 4)
+        sr = 22050
+    
+    # Process
+    chroma = stream_processor.get_chromagram(audio_chunk, sr=sr)
+    stream_finder.update(chroma)
+    rukooz_idx = stream_finder.find_rukooz()
+    sequence = normalizer.normalize(chroma, rukooz_idx)
+    prediction = brain.predict(sequence)
+    
+    # base64 float16 bytes: a fraction of the size and cost of a nested JSON float list
+    response = {
+        "chromagram": base64.b64encode(chroma.astype(np.float16).tobytes()).decode('ascii'),
+        "chroma_shape": list(chroma.shape),
+        "chroma_dtype": "float16",
+        "rukooz": int(rukooz_idx),
+        "prediction": prediction["prediction"],
+        "jins_analysis": prediction.get("jins_analysis", {}),
+        "confidence": prediction.get("confidence", 0)
+    }
+    return response
+
+
 @app.websocket("/ws/analyze")
 async def websocket_endpoint(websocket: WebSocket):
     """WebSocket endpoint for real-time audio analysis."""
     await websocket.accept()
     print("WebSocket Connected")
     
+    # Per-connection running tonic: each chunk updates it instead of re-deriving it alone
+    stream_finder = TonicFinder(bins_per_octave=36)
+    loop = asyncio.get_running_loop()
+    
     try:
         while True:
             data = await websocket.receive_bytes()
@@ -376,34 +461,9 @@ async def websocket_endpoint(websocket: WebSocket):
                 continue
             
             try:
-                import io
-                
-                # Try to load as WAV first
-                if SOUNDFILE_AVAILABLE:
-                    with sf.SoundFile(io.BytesIO(data)) as f:
-                        audio_chunk = f.read(dtype='float32')
-                        sr = f.samplerate
-                else:
-                    # Fallback: assume raw float32 PCM
-                    audio_chunk = np.frombuffer(data, dtype=np.float32)
-                    sr = 22050
-                
-                # Process
-                chroma = processor.get_chromagram(audio_chunk, sr=sr)
-                rukooz_idx = finder.find_rukooz(chroma)
-                sequence = normalizer.normalize(chroma, rukooz_idx)
-                prediction = brain.predict(sequence)
-                
-                response = {
-                    "chromagram": chroma.tolist(),
-                    "rukooz": int(rukooz_idx),
-                    "prediction": prediction["prediction"],
-                    "jins_analysis": prediction.get("jins_analysis", {}),
-                    "confidence": prediction.get("confidence", 0)
-                }
-                
+                # CQT/HPSS are CPU-bound; run them off the event loop so other clients keep being served
+                response = await loop.run_in_executor(None, analyze_stream_chunk, data, stream_finder)
                 await websocket.send_json(response)
-                
             except Exception as e:
                 print(f"Error processing chunk: {e}")
                 await websocket.send_json({"error": str(e)})
@@ -0,0 +1,21 @@
+"""
+Optional numba support shared by the compiled kernels.
+
+Without numba, njit is a no-op decorator and prange is range, so the
+kernels still import and run as plain Python; callers check
+NUMBA_AVAILABLE to pick a NumPy path where plain Python would be slow.
+"""
+
+try:
+    from numba import njit, prange, types as nb_types
+    NUMBA_AVAILABLE = True
+except ImportError:
+    nb_types = None
+    prange = range
+    NUMBA_AVAILABLE = False
+
+    def njit(*args, **kwargs):
+        """Fallback no-op decorator: kernels run as plain Python without numba."""
+        if len(args) == 1 and callable(args[0]):
+            return args[0]
+        return lambda func: func
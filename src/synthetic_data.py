@@ -2,27 +2,134 @@ import numpy as np
 import os
 import soundfile as sf
 
+try:
+    from .numba_compat import njit, prange, NUMBA_AVAILABLE
+except ImportError:
+    from numba_compat import njit, prange, NUMBA_AVAILABLE
+
+
+# Weighted random walk: favor small steps. The CDF is built the way
+# np.random.choice builds it, so the same uniforms pick the same steps.
+_STEPS = np.array([-2, -1, 0, 1, 2])
+_STEP_CDF = np.cumsum([0.1, 0.3, 0.2, 0.3, 0.1])
+_STEP_CDF /= _STEP_CDF[-1]
+
+
+def _draw_steps(length):
+    """length walk steps by inverse CDF: one uniform batch mapped in one searchsorted."""
+    return _STEPS[np.searchsorted(_STEP_CDF, np.random.random(length), side='right')]
+
+
+@njit(cache=True)
+def _walk(n_scale, steps):
+    """Scale-degree walk from the root applying steps (clamped), resolving back to 0."""
+    out = np.zeros(steps.shape[0] + 2, dtype=np.int64)
+    current = 0
+    for i in range(steps.shape[0]):
+        current = min(max(current + steps[i], 0), n_scale - 1)
+        out[i + 1] = current
+    return out
+
+
+# Samples per sine recurrence before it is reseeded from sin (bounds the drift)
+_RESEED_BLOCK = 4096
+
+
+@njit(parallel=True, fastmath=True, cache=True)
+def _render_tone(omega, step, coeffs, mult, out):
+    """out[j] = sum_k coeffs[k] * sin(omega * mult[k] * j * step), fused over all cores.
+
+    Each partial follows sin((j+1)x) = 2cos(x) sin(jx) - sin((j-1)x), so only
+    the first two samples of every _RESEED_BLOCK block call sin; blocks run in parallel.
+    """
+    n = out.shape[0]
+    n_harm = coeffs.shape[0]
+    for b in prange((n + _RESEED_BLOCK - 1) // _RESEED_BLOCK):
+        start = b * _RESEED_BLOCK
+        stop = min(start + _RESEED_BLOCK, n)
+        out[start:stop] = 0.0
+        for k in range(n_harm):
+            w = omega * mult[k]
+            c = 2.0 * np.cos(w * step)
+            s_prev = np.sin(w * ((start - 1) * step))
+            s_cur = np.sin(w * (start * step))
+            for j in range(start, stop):
+                out[j] += coeffs[k] * s_cur
+                s_next = c * s_cur - s_prev
+                s_prev = s_cur
+                s_cur = s_next
+
+
 class SyntheticDataGenerator:
     """Generates synthetic audio files for Maqam training (36-bin resolution)."""
     
     def __init__(self, output_dir="data_synthetic_36", sr=22050):
         self.output_dir = output_dir
         self.sr = sr
-        if not os.path.exists(output_dir):
+        # Harmonic amplitudes and frequency multiples mixed into every tone
+        self._coeffs = np.array([0.5, 0.2, 0.1])
+        self._mult = np.array([1.0, 2.0, 3.0])
+        # (freq, duration in 10 ms units) -> tone; scales only have a handful of pitches
+        self._tone_cache = {}
+        # output_dir=None for in-memory use (generate_maqam_batch) only
+        if output_dir and not os.path.exists(output_dir):
             os.makedirs(output_dir)
 
     def generate_tone(self, freq, duration):
+        n = int(self.sr * duration)
+        if NUMBA_AVAILABLE and n > 0:
+            # Parallel sine recurrences, no (3, N) phase temporaries; same t grid as linspace below
+            tone = np.empty(n, dtype=np.float32)
+            _render_tone(2 * np.pi * freq, duration / n, self._coeffs, self._mult, tone)
+            return tone
+        
         t = np.linspace(0, duration, int(self.sr * duration), endpoint=False)
-        # Add some harmonics for realism (HPSS easier to test)
-        signal = 0.5 * np.sin(2 * np.pi * freq * t)
-        signal += 0.2 * np.sin(2 * np.pi * freq * 2 * t)
-        signal += 0.1 * np.sin(2 * np.pi * freq * 3 * t)
-        return signal
+        # Add some harmonics for realism (HPSS easier to test):
+        # all three partials in one (3, N) sin pass, mixed with one matmul
+        # (phases stay float64: t * freq reaches thousands of radians)
+        phases = (2 * np.pi * freq) * np.multiply.outer(self._mult, t)
+        return (self._coeffs @ np.sin(phases, out=phases)).astype(np.float32)
+
+    def cached_tone(self, freq, dur_bin):
+        """generate_tone(freq, dur_bin * 10 ms), synthesized once per (freq, dur_bin)."""
+        key = (freq, dur_bin)
+        tone = self._tone_cache.get(key)
+        if tone is None:
+            tone = self.generate_tone(freq, dur_bin * 0.01)
+            tone.flags.writeable = False
+            self._tone_cache[key] = tone
+        return tone
+
+    def generate_melody(self, scale_notes):
+        """One random melody over scale_notes (Hz) as a float32 signal."""
+        # Longer walks for better Seyir training
+        length = np.random.randint(40, 80)
+        
+        # Start at root, random walk, then resolve to tonic
+        melody_indices = _walk(len(scale_notes), _draw_steps(length))
+        
+        # Note durations of 0.2-0.6 s in 10 ms steps, so tones can be reused
+        dur_bins = np.random.randint(20, 61, size=len(melody_indices))
+        
+        # Per-note data as parallel arrays: one gather for the pitches and
+        # the tone lengths generate_tone will produce, computed up front
+        freqs = np.asarray(scale_notes, dtype=np.float64)[melody_indices]
+        n_per_note = (self.sr * (dur_bins * 0.01)).astype(np.int64)
+        
+        # Size the whole file up front and write each tone into its slot,
+        # instead of re-concatenating the growing buffer per note
+        offsets = np.zeros(len(n_per_note) + 1, dtype=np.int64)
+        np.cumsum(n_per_note, out=offsets[1:])
+        audio = np.empty(offsets[-1], dtype=np.float32)
+        
+        for n in range(len(freqs)):
+            audio[offsets[n]:offsets[n + 1]] = self.cached_tone(freqs[n], int(dur_bins[n]))
+        return audio
 
     def generate_maqam_samples(self, maqam_name, scale_notes, n_samples=50):
         """
         Generates random melodies based on a scale.
-        scale_notes: List of frequencies (Hz)
+        scale_notes: Sequence of frequencies (Hz)
         """
         maqam_dir = os.path.join(self.output_dir, maqam_name)
         if not os.path.exists(maqam_dir):
@@ -31,40 +138,39 @@ class SyntheticDataGenerator:
         print(f"Generating {n_samples} samples for {maqam_name}...")
 
         for i in range(n_samples):
-            audio = np.array([])
-            melody_indices = [0] # Start at root
-            
-            # Longer walks for better Seyir training
-            length = np.random.randint(40, 80)
-            
-            for _ in range(length):
-                last_idx = melody_indices[-1]
-                # Weighted random walk: favor small steps
-                step = np.random.choice([-2, -1, 0, 1, 2], p=[0.1, 0.3, 0.2, 0.3, 0.1])
-                new_idx = np.clip(last_idx + step, 0, len(scale_notes) - 1)
-                melody_indices.append(new_idx)
-                
-            melody_indices.append(0) # resolving to tonic
-            
-            for idx in melody_indices:
-                freq = scale_notes[idx]
-                dur = np.random.uniform(0.2, 0.6)
-                tone = self.generate_tone(freq, dur)
-                audio = np.concatenate((audio, tone))
-                
+            audio = self.generate_melody(scale_notes)
             filename = os.path.join(maqam_dir, f"{maqam_name}_{i}.wav")
-            sf.write(filename, audio, self.sr)
+            # Melodies peak below 0.8, so 16-bit PCM needs no rescaling
+            sf.write(filename, audio.astype(np.float32, copy=False), self.sr, subtype='PCM_16')
 
-if __name__ == "__main__":
-    gen = SyntheticDataGenerator(output_dir="data_synthetic_36")
-    
+    def generate_maqam_batch(self, maqam_name, scale_notes, n_samples=50):
+        """
+        In-memory variant of generate_maqam_samples for training straight away.
+        
+        Returns:
+            (audio, lengths): a zero-padded (n_samples, max_len) float32 array
+            and the int32 length of each row's melody
+        """
+        print(f"Generating {n_samples} in-memory samples for {maqam_name}...")
+        melodies = [self.generate_melody(scale_notes) for _ in range(n_samples)]
+        
+        lengths = np.array([len(melody) for melody in melodies], dtype=np.int32)
+        audio = np.zeros((n_samples, lengths.max(initial=0)), dtype=np.float32)
+        for row, melody in zip(audio, melodies):
+            row[:len(melody)] = melody
+        return audio, lengths
+
+
+def scale_freqs(base, iv):
+    """Frequencies (Hz) of intervals iv (semitones, may be fractional) above base (Hz)."""
+    # 1 semitone is exactly 3 bins in 36-TET, so 2^(n/12) covers quarter tones too
+    return base * np.exp2(np.asarray(iv, dtype=np.float64) / 12.0)
+
+
+def default_scales():
+    """Scale frequencies (Hz) for each synthetic maqam, keyed by maqam name."""
     # Fundamental frequency for D (Re) = 293.66 Hz
-    # 36-TET intervals from D
-    def get_freq(semitones_from_D):
-        # semitones can be fractional. 1 semitone = 3 steps in 36-TET (since 12 * 3 = 36)
-        # Actually in 36-TET, 1 semitone is exactly 3 bins.
-        # But we can just use 2^(n/12) logic directly or 2^(k/36).
-        return 293.66 * (2 ** (semitones_from_D / 12.0))
+    D = 293.66
 
     # Scales defined by intervals from Tonic (D) in semitones
     # Bayati: D, E-half-flat (-1.5), F (-0.5?), no wait.
@@ -77,22 +183,27 @@ if __name__ == "__main__":
     # Eq (E half flat) ~ 1.5 semitones = 150 cents
     # F = 3 semitones? No, D to F is minor third (3 semitones).
     bayati_intervals = [0, 1.5, 3.0, 5.0, 7.0, 8.0, 10.0, 12.0]
-    bayati_scale = [get_freq(x) for x in bayati_intervals]
-    gen.generate_maqam_samples("Bayati", bayati_scale, n_samples=100) # Increased for MLP
+    bayati_scale = scale_freqs(D, bayati_intervals)
     
     # 2. Rast (C tonic for synthesis usually, but let's keep D for consistency to test TonicFinder)
     # Rast on D: D, E^ (1.75?), F#^ (3.75?)... 
     # Let's use standard C Rast intervals relative to C=261.63
     C = 261.63
-    def get_freq_C(semitones): return C * (2**(semitones/12.0))
     # Rast: C, D, Ed, F, G, A, Bd, C
     # C(0), D(2), Eq(3.5), F(5), G(7), A(9), Bq(10.5), C(12)
     rast_intervals = [0, 2, 3.5, 5, 7, 9, 10.5, 12]
-    rast_scale = [get_freq_C(x) for x in rast_intervals]
-    gen.generate_maqam_samples("Rast", rast_scale, n_samples=100)
+    rast_scale = scale_freqs(C, rast_intervals)
     
     # 3. Hijaz (D tonic)
     # D(0), Eb(1), F#(4), G(5), A(7), Bb(8), C(10), D(12)
     hijaz_intervals = [0, 1.0, 4.0, 5.0, 7.0, 8.0, 10.0, 12.0]
-    hijaz_scale = [get_freq(x) for x in hijaz_intervals]
-    gen.generate_maqam_samples("Hijaz", hijaz_scale, n_samples=100)
+    hijaz_scale = scale_freqs(D, hijaz_intervals)
+    
+    return {"Bayati": bayati_scale, "Rast": rast_scale, "Hijaz": hijaz_scale}
+
+
+if __name__ == "__main__":
+    gen = SyntheticDataGenerator(output_dir="data_synthetic_36")
+    
+    for maqam_name, scale in default_scales().items():
+        gen.generate_maqam_samples(maqam_name, scale, n_samples=100) # Increased for MLP
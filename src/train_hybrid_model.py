@@ -1,12 +1,15 @@
+import argparse
 import os
 from SignalProcessor import SignalProcessor
 from TonicFinder import TonicFinder
 from SequenceNormalizer import SequenceNormalizer
 from MaqamTrainer import MaqamTrainer
+from synthetic_data import SyntheticDataGenerator, default_scales
 
 # Configuration
 DATASET_PATH = "/Users/sezarhanna/Downloads/maqamidataset"
 OUTPUT_DB = "maqam_database_hybrid.json"
+CHROMA_CACHE_DIR = "cache"
 
 # Mapping from folder names to Maqam names
 MAPPING = {
@@ -20,12 +23,34 @@ MAPPING = {
     "Sekah": "Sikah"
 }
 
+def train_synthetic(trainer, processor, finder, normalizer, n_samples):
+    """Train on generated melodies held in memory, without writing or re-reading WAVs."""
+    generator = SyntheticDataGenerator(output_dir=None, sr=processor.sr)
+    for maqam_name, scale in default_scales().items():
+        audio, lengths = generator.generate_maqam_batch(maqam_name, scale, n_samples=n_samples)
+        trainer.train_on_arrays(maqam_name, audio, lengths, processor, finder, normalizer, sr=generator.sr)
+
 def main():
+    parser = argparse.ArgumentParser(description="Train the hybrid maqam models.")
+    parser.add_argument("--synthetic", action="store_true",
+                        help="Train on in-memory synthetic melodies instead of DATASET_PATH")
+    parser.add_argument("--samples", type=int, default=100,
+                        help="Synthetic melodies per maqam (with --synthetic)")
+    args = parser.parse_args()
+    
     print("Initializing components...")
-    processor = SignalProcessor()
+    processor = SignalProcessor(cache_dir=CHROMA_CACHE_DIR)
     finder = TonicFinder()
     normalizer = SequenceNormalizer()
-    trainer = MaqamTrainer()
+    trainer = MaqamTrainer(n_workers=os.cpu_count())
+    
+    if args.synthetic:
+        print(f"Starting synthetic training ({args.samples} samples per maqam)...")
+        train_synthetic(trainer, processor, finder, normalizer, args.samples)
+        print("Finalizing and saving model...")
+        trainer.finalize_and_save(markov_file=OUTPUT_DB)
+        print("Training complete!")
+        return
     
     if not os.path.exists(DATASET_PATH):
         print(f"Error: Dataset path {DATASET_PATH} not found.")
@@ -33,13 +58,18 @@ def main():
 
     print(f"Starting training on {DATASET_PATH}...")
     
+    folders = []
     for folder_name, maqam_name in MAPPING.items():
         folder_path = os.path.join(DATASET_PATH, folder_name)
         if os.path.exists(folder_path):
-            print(f"-- Processing {folder_name} -> {maqam_name}")
-            trainer.train_on_folder(maqam_name, folder_path, processor, finder, normalizer)
+            print(f"-- Queued {folder_name} -> {maqam_name}")
+            folders.append((maqam_name, folder_path))
         else:
             print(f"Warning: Folder {folder_name} not found in dataset.")
+    
+    # One extraction pass over every folder's files keeps all workers busy
+    # across folder boundaries
+    trainer.train_on_folders(folders, processor, finder, normalizer)
 
     print("Finalizing and saving model...")
     trainer.finalize_and_save(markov_file=OUTPUT_DB)
@@ -0,0 +1,41 @@
+import os
+import sys
+import tempfile
+import unittest
+
+import numpy as np
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", "src"))
+
+from MLPClassifier import MLPClassifier
+
+
+class MLPClassifierBatchTest(unittest.TestCase):
+    @classmethod
+    def setUpClass(cls):
+        cls.tmp_dir = tempfile.TemporaryDirectory()
+        cls.mlp = MLPClassifier(model_path=os.path.join(cls.tmp_dir.name, "mlp_model.pkl"))
+        cls.mlp.model.set_params(hidden_layer_sizes=(16,), max_iter=200)
+
+        rng = np.random.default_rng(0)
+        cls.X = rng.random((30, 36 * 36))
+        cls.y = ["Bayati", "Rast", "Hijaz"] * 10
+        cls.mlp.train(cls.X, cls.y)
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.tmp_dir.cleanup()
+
+    def test_empty_batch(self):
+        probs = self.mlp.predict_proba_batch(np.empty((0, 36, 36)))
+        self.assertEqual(probs.shape, (0, 3))
+        self.assertEqual(self.mlp.predict_labels([]), [])
+
+    def test_batch_matches_sklearn(self):
+        np.testing.assert_allclose(self.mlp.predict_proba_batch(self.X),
+                                   self.mlp.model.predict_proba(self.X), atol=1e-5)
+        self.assertEqual(self.mlp.predict_labels(self.X), list(self.mlp.model.predict(self.X)))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -3,10 +3,12 @@
 Script to verify the keras model by running inference on the maqami dataset.
 """
 import os
+import itertools
 import numpy as np
 import tensorflow as tf
-import librosa
 from collections import Counter
+from concurrent.futures import ThreadPoolExecutor
+from build_mel_cache import compute_features, load_cached_features
 
 # Model and dataset paths
 MODEL_PATH = '/Users/sezarhanna/Downloads/best_model_music_cnn_pitch.keras'
@@ -17,25 +19,14 @@ MAQAM_CLASSES = ['Agm', 'Byat', 'Cord', 'Hjaz', 'Nahawond', 'Rast', 'Sba']
 
 def extract_features(audio_path, target_shape=(60, 358)):
     """Extract mel spectrogram features from audio file."""
+    # Precomputed by build_mel_cache.py (skips the mp3 decode + STFT)
+    cached = load_cached_features(audio_path)
+    if cached is not None:
+        return cached
+    
     try:
-        # Load audio file
-        y, sr = librosa.load(audio_path, sr=22050, duration=8.0)
-        
-        # Extract mel spectrogram (60 mel bands)
-        mel_spec = librosa.feature.melspectrogram(y=y, sr=sr, n_mels=60, n_fft=2048, hop_length=512)
-        mel_spec_db = librosa.power_to_db(mel_spec, ref=np.max)
-        
-        # Pad or truncate to target shape
-        if mel_spec_db.shape[1] < target_shape[1]:
-            pad_width = target_shape[1] - mel_spec_db.shape[1]
-            mel_spec_db = np.pad(mel_spec_db, ((0, 0), (0, pad_width)), mode='constant')
-        else:
-            mel_spec_db = mel_spec_db[:, :target_shape[1]]
-        
-        # Normalize
-        mel_spec_db = (mel_spec_db - mel_spec_db.min()) / (mel_spec_db.max() - mel_spec_db.min() + 1e-8)
-        
-        return mel_spec_db
+        # Same pipeline as the cache, but short clips are zero-padded rather than skipped
+        return compute_features(audio_path, target_shape, min_seconds=0)
     except Exception as e:
         print(f"Error processing {audio_path}: {e}")
         return None
@@ -53,6 +44,12 @@ def main():
     print(f"   Output shape: {model.output_shape}")
     print(f"   Number of classes: {model.output_shape[-1]}")
     
+    # Direct graph-mode call: skips predict's per-call callback/batching machinery;
+    # the unknown batch dimension keeps the last, shorter batch from retracing
+    @tf.function(input_signature=[tf.TensorSpec((None,) + tuple(model.input_shape[1:]), tf.float32)])
+    def infer(x):
+        return model(x, training=False)
+    
     # Get the class names from the model if available
     num_classes = model.output_shape[-1]
     print(f"\n   Model expects {num_classes} classes")
@@ -66,6 +63,9 @@ def main():
     correct = 0
     total = 0
     
+    # Extract every file first, then run the CNN over all of them in batches
+    # instead of one predict call (and its dispatch overhead) per file
+    maqam_files = []
     for maqam_idx, maqam in enumerate(MAQAM_CLASSES):
         maqam_path = os.path.join(DATASET_PATH, maqam)
         if not os.path.exists(maqam_path):
@@ -74,23 +74,34 @@ def main():
         
         # Get first 5 audio files for testing
         audio_files = [f for f in os.listdir(maqam_path) if f.endswith('.mp3')][:5]
-        
-        predictions = []
-        for audio_file in audio_files:
-            audio_path = os.path.join(maqam_path, audio_file)
-            features = extract_features(audio_path)
-            
+        maqam_files.append((maqam_idx, maqam, [os.path.join(maqam_path, f) for f in audio_files]))
+    
+    # Decoding and STFTs run in C and release the GIL, so threads overlap files
+    all_paths = [path for _, _, paths in maqam_files for path in paths]
+    with ThreadPoolExecutor(max_workers=os.cpu_count()) as executor:
+        extracted = iter(list(executor.map(extract_features, all_paths)))
+    
+    tested_maqamat = []
+    all_features = []
+    for maqam_idx, maqam, paths in maqam_files:
+        start = len(all_features)
+        for features in itertools.islice(extracted, len(paths)):
             if features is not None:
-                # Reshape for model input (batch, height, width, channels)
-                features = features.reshape(1, 60, 358, 1)
-                
-                # Run inference
-                pred = model.predict(features, verbose=0)
-                pred_class = np.argmax(pred[0])
-                confidence = pred[0][pred_class] * 100
-                predictions.append(pred_class)
+                all_features.append(features)
                 total += 1
-                
+        tested_maqamat.append((maqam_idx, maqam, start, len(all_features)))
+    
+    pred_classes = []
+    if all_features:
+        # (batch, height, width, channels)
+        batch = np.stack(all_features)[..., np.newaxis]
+        preds = np.concatenate([infer(tf.constant(batch[i:i + 64])).numpy()
+                                for i in range(0, len(batch), 64)])
+        pred_classes = np.argmax(preds, axis=1).tolist()
+    
+    for maqam_idx, maqam, start, end in tested_maqamat:
+        predictions = pred_classes[start:end]
+        
         if predictions:
             # Get most common prediction for this maqam
             most_common = Counter(predictions).most_common(1)[0]